@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+A stand-in for the zenity executable, for running the wrapper without a display - in tests, in CI and in benchmarks.
+It parses the same flags as zenity, consumes standard input the way the real dialogue would and answers with a
+scripted output and exit code instead of waiting for a human.
+
+Select it with zenity.set_backend(zenity.FAKE_ZENITY) or by setting the ZENITY_BACKEND environment variable.
+
+The answers are scripted with environment variables:
+  FAKE_ZENITY_SCRIPT        path of a JSON file mapping a dialogue type (e.g. "question", "list", "forms") to an
+                            object with any of "output", "exit_code", "delay" and "stderr", or to a list of such
+                            objects answering successive dialogues of that type (the last one is repeated) - e.g.
+                            {"output": "Next", "exit_code": 1} scripts a press of the extra button labeled Next
+  FAKE_ZENITY_OUTPUT        the output of every dialogue
+  FAKE_ZENITY_EXIT_CODE     the exit code of every dialogue
+  FAKE_ZENITY_DELAY         seconds to wait before answering, simulating the user
+  FAKE_ZENITY_LOG           path of a file to which every invocation appends a JSON line with its arguments and the
+                            standard input it received
+Without a script every dialogue is accepted with a plausible default answer.
+"""
+
+import datetime
+import json
+import os
+import sys
+import time
+
+DIALOGUE_TYPES = ('calendar', 'entry', 'error', 'info', 'file-selection', 'list', 'notification', 'progress',
+                  'question', 'text-info', 'warning', 'scale', 'color-selection', 'password', 'forms')
+VERSION = '3.42.1'
+
+
+def parse_arguments(argv):
+    """
+    Split zenity arguments into options and positional values
+    :param argv: the arguments, without the executable
+    :return: a tuple of a dict of options (flags map to True, repeated options to a list) and a list of positionals
+    """
+    options = {}
+    positionals = []
+    for argument in argv:
+        if not argument.startswith('--'):
+            positionals.append(argument)
+            continue
+        name, has_value, value = argument[2:].partition('=')
+        value = value if has_value else True
+        if name in options:
+            if not isinstance(options[name], list):
+                options[name] = [options[name]]
+            options[name].append(value)
+        else:
+            options[name] = value
+    return options, positionals
+
+
+def as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def read_stdin():
+    return sys.stdin.buffer.read().decode('utf-8', errors='replace')
+
+
+def list_answer(options, positionals, stdin_lines):
+    columns = as_list(options.get('column'))
+    cells = positionals or stdin_lines
+    if not columns or len(cells) < len(columns):
+        return ''
+    row = cells[:len(columns)]
+    first_column = 1 if 'checklist' in options or 'radiolist' in options else 0
+    print_column = options.get('print-column')
+    if print_column == 'ALL':
+        values = row[first_column:]
+    elif print_column is not None:
+        values = [row[int(index) - 1] for index in str(print_column).split(',')]
+    else:
+        values = [row[first_column]]
+    return options.get('separator', '|').join(values)
+
+
+def forms_answer(options, argv):
+    date_format = options.get('forms-date-format', '%d/%m/%Y')
+    values = []
+    for argument in argv:
+        name = argument[2:].partition('=')[0]
+        if name == 'add-entry':
+            values.append('entry')
+        elif name == 'add-password':
+            values.append('password')
+        elif name == 'add-calendar':
+            values.append(datetime.date.today().strftime(date_format))
+        elif name in ('list-values', 'combo-values'):
+            values.append(argument.partition('=')[2].split('|')[0])
+    return options.get('separator', '|').join(values)
+
+
+def default_answer(dialogue_type, options, positionals, argv, stdin_text):
+    """
+    :return: the output a user accepting the dialogue with its defaults would produce
+    """
+    separator = options.get('separator', '|')
+    if dialogue_type == 'calendar':
+        today = datetime.date.today()
+        date = datetime.date(int(options.get('year', today.year)), int(options.get('month', today.month)),
+                             int(options.get('day', today.day)))
+        return date.strftime(options.get('date-format', '%d/%m/%Y'))
+    if dialogue_type == 'entry':
+        return options.get('entry-text', positionals[0] if positionals else '')
+    if dialogue_type == 'password':
+        return f'user{separator}password' if 'username' in options else 'password'
+    if dialogue_type == 'file-selection':
+        if 'multiple' in options:
+            return separator.join(['/tmp/fake-zenity-1', '/tmp/fake-zenity-2'])
+        return '/tmp/fake-zenity' + ('/' if 'directory' in options else '')
+    if dialogue_type == 'list':
+        return list_answer(options, positionals, stdin_text.splitlines())
+    if dialogue_type == 'color-selection':
+        return 'rgb(255,0,0)'
+    if dialogue_type == 'scale':
+        return str(options.get('value', options.get('min-value', 0)))
+    if dialogue_type == 'forms':
+        return forms_answer(options, argv)
+    if dialogue_type == 'text-info' and 'editable' in options:
+        return stdin_text
+    return None
+
+
+def reads_stdin(dialogue_type, options, positionals):
+    """
+    :return: whether the real zenity would read its standard input for this dialogue
+    """
+    if dialogue_type == 'progress':
+        return True
+    if dialogue_type == 'list':
+        return not positionals
+    if dialogue_type == 'text-info':
+        return 'filename' not in options
+    if dialogue_type == 'notification':
+        return 'listen' in options
+    return False
+
+
+def next_scripted_answer(script_path, dialogue_type, answers):
+    """
+    Pick the answer of this invocation from a list of successive answers, counting the invocations of every dialogue
+    type in a state file next to the script
+    """
+    state_path = script_path + '.state'
+    try:
+        with open(state_path) as state_file:
+            state = json.load(state_file)
+    except (OSError, ValueError):
+        state = {}
+    index = state.get(dialogue_type, 0)
+    state[dialogue_type] = index + 1
+    with open(state_path, 'w') as state_file:
+        json.dump(state, state_file)
+    return answers[min(index, len(answers) - 1)] if answers else {}
+
+
+def load_script(dialogue_type):
+    answer = {}
+    script_path = os.environ.get('FAKE_ZENITY_SCRIPT')
+    if script_path:
+        with open(script_path) as script_file:
+            scripted = json.load(script_file).get(dialogue_type, {})
+        if isinstance(scripted, list):
+            scripted = next_scripted_answer(script_path, dialogue_type, scripted)
+        answer.update(scripted)
+    for key, environment_variable, convert in (('output', 'FAKE_ZENITY_OUTPUT', str),
+                                               ('exit_code', 'FAKE_ZENITY_EXIT_CODE', int),
+                                               ('delay', 'FAKE_ZENITY_DELAY', float)):
+        if environment_variable in os.environ:
+            answer[key] = convert(os.environ[environment_variable])
+    return answer
+
+
+def main(argv):
+    if '--version' in argv:
+        print(VERSION)
+        return 0
+    options, positionals = parse_arguments(argv)
+    dialogue_type = next((name for name in DIALOGUE_TYPES if name in options), None)
+    if dialogue_type is None:
+        sys.stderr.write('You must specify a dialog type. See \'zenity --help\' for details\n')
+        return 255
+    answer = load_script(dialogue_type)
+    stdin_text = read_stdin() if reads_stdin(dialogue_type, options, positionals) else ''
+
+    log_path = os.environ.get('FAKE_ZENITY_LOG')
+    if log_path:
+        with open(log_path, 'a') as log_file:
+            log_file.write(json.dumps({'arguments': argv, 'stdin': stdin_text}) + '\n')
+
+    delay = answer.get('delay', 0)
+    timeout = options.get('timeout')
+    if timeout is not None and delay >= float(timeout):
+        time.sleep(float(timeout))
+        return 5
+    time.sleep(delay)
+
+    if answer.get('stderr'):
+        sys.stderr.write(answer['stderr'])
+    exit_code = answer.get('exit_code', 0)
+    if exit_code == 0:
+        output = answer.get('output', default_answer(dialogue_type, options, positionals, argv, stdin_text))
+        if output is not None:
+            sys.stdout.write(output if output.endswith('\n') else output + '\n')
+    elif 'output' in answer:
+        sys.stdout.write(answer['output'])
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
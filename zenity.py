@@ -4,61 +4,516 @@ Date    :   19/06/2020
 
 This is a python wrapper for the linux zenity GUI tool.
 It runs zenity as a separate process using the subprocess module
-
-I haven't yet implemented the forms option but I'll probably get to it sometime
-
-Forms dialog options
-  --forms                                           Display forms dialog
-  --add-entry=Field name                            Add a new Entry in forms dialog
-  --add-password=Field name                         Add a new Password Entry in forms dialog
-  --add-calendar=Calendar field name                Add a new Calendar in forms dialog
-  --add-list=List field and header name             Add a new List in forms dialog
-  --list-values=List of values separated by |       List of values for List
-  --column-values=List of values separated by |     List of values for columns
-  --add-combo=Combo box field name                  Add a new combo box in forms dialog
-  --combo-values=List of values separated by |      List of values for combo box
-  --show-header                                     Show the columns header
-  --text=TEXT                                       Set the dialog text
-  --separator=SEPARATOR                             Set output separator character
-  --forms-date-format=PATTERN                       Set the format for the returned date
 """
 
+import argparse
+import asyncio
+import atexit
+import bisect
+import codecs
+import collections
+import contextlib
 import datetime
+import errno
+import functools
+import io
+import itertools
+import json
+import os
+import pathlib
+import queue
+import re
+import selectors
 import shlex
+import shutil
+import signal
+import socket
+import socketserver
+import stat
+import struct
 import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+import weakref
+from collections.abc import Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing import shared_memory
 from typing import Union
 
 
-def run_local_command(command, wait=True):
+def run_local_command(command, wait=True, stdin=True, close_fds=True):
     """
     This function runs a command using subprocess
+    The executable is resolved on the PATH once and cached, and the process is launched without a preexec function
+    so that subprocess can use vfork (or posix_spawn when close_fds is False) instead of forking this process
     :param command: The command to run - either a list of arguments or a string
     :param wait: whether to wait for the command to complete or return immediately
+    :param stdin: whether to open a pipe to the standard input of the command, otherwise it reads from /dev/null
+    :param close_fds: whether to close inherited file descriptors in the child, python's own descriptors are never
+    inheritable so this can usually be turned off
     :return: The subprocess object
     """
     if isinstance(command, str):
         command = shlex.split(command)
+    command = [resolve_executable(command[0])] + list(command[1:])
     process = subprocess.Popen(command,
                                stdout=subprocess.PIPE,
-                               stdin=subprocess.PIPE,
-                               stderr=subprocess.PIPE)
+                               stdin=subprocess.PIPE if stdin else subprocess.DEVNULL,
+                               stderr=subprocess.PIPE,
+                               close_fds=close_fds)
     if wait:
         process.wait()
     return process
 
 
+@functools.lru_cache(maxsize=None)
+def resolve_executable(name):
+    """
+    Find an executable on the PATH, the result is cached - call resolve_executable.cache_clear() if the PATH changes
+    :param name: the name or path of the executable
+    :return: the absolute path of the executable
+    """
+    path = shutil.which(name)
+    if path is None:
+        raise ZenityError(f'{name} was not found on the PATH')
+    return os.path.abspath(path)
+
+
+# the bundled stand-in zenity executable, for running without a display
+FAKE_ZENITY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_zenity.py')
+# the bundled resident GTK helper used by WarmDialoguePool
+GTK_HELPER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'zenity_helper.py')
+
+# the command that runs zenity, replaced with set_backend or the ZENITY_BACKEND environment variable
+_backend = ['zenity']
+
+
+def set_backend(command=None):
+    """
+    This function replaces the command used to run zenity by every dialogue, for example with the bundled stand-in
+    (FAKE_ZENITY) for running tests and benchmarks without a display
+    :param command: the command - either a list of arguments or a string, a python script is run with this
+    interpreter. None restores the real zenity
+    """
+    global _backend
+    if command is None:
+        command = 'zenity'
+    if isinstance(command, str):
+        command = [sys.executable, command] if command.endswith('.py') else shlex.split(command)
+    _backend = list(command)
+
+
+def get_backend():
+    """
+    :return: the command used to run zenity, as a list of arguments
+    """
+    return list(_backend)
+
+
+@functools.lru_cache(maxsize=None)
+def _backend_version(backend):
+    process = run_local_command(list(backend) + ['--version'], stdin=False)
+    output = process.stdout.read().decode().strip()
+    process.stdout.close()
+    process.stderr.close()
+    return output
+
+
+def get_zenity_version():
+    """
+    :return: the version string reported by the current backend, cached after the first call
+    """
+    return _backend_version(tuple(_backend))
+
+
+set_backend(os.environ.get('ZENITY_BACKEND'))
+
+
 class ZenityError(Exception):
     pass
 
 
+class ZenityTimeout(ZenityError):
+    """
+    Raised when a dialogue does not complete before the deadline given to wait, run or await_completion
+    """
+    pass
+
+
+# the exit code of a dialogue that was closed by its --timeout, which is a regular answer rather than an error
+TIMEOUT_EXIT_CODE = 5
+# the exit codes that are answers rather than failures - accepted, cancelled and timed out
+ANSWER_EXIT_CODES = (0, 1, TIMEOUT_EXIT_CODE)
+# the number of seconds a stopped zenity process has to exit after it is terminated, before it is killed
+STOP_GRACE = 1.0
+
+
+DialogueEvent = collections.namedtuple('DialogueEvent', ['kind', 'dialogue', 'timestamp', 'exit_code', 'bytes_in',
+                                                         'bytes_out'], defaults=(None, 0, 0))
+DialogueEvent.__doc__ = """
+A lifecycle event of a dialogue, passed to the observers registered with add_observer.
+kind is one of 'start' (about to spawn zenity), 'spawned' (zenity is running), 'first_output' (the first bytes of
+standard output arrived), 'exit' (zenity exited, with its exit code and the bytes written to and read from it) and
+'stop' (the same as 'exit', but zenity was stopped by the caller).
+timestamp is a time.monotonic() timestamp
+"""
+
+_observers = []
+
+
+def add_observer(callback):
+    """
+    Register a function to be called with a DialogueEvent for every lifecycle event of every dialogue.
+    Observers may be called from background threads and should return quickly
+    :param callback: the function to call
+    """
+    global _observers
+    _observers = _observers + [callback]
+
+
+def remove_observer(callback):
+    """
+    Unregister a function registered with add_observer
+    :param callback: the function to unregister
+    """
+    global _observers
+    _observers = [observer for observer in _observers if observer is not callback]
+
+
+# zenity's standard error is only used for error reports, so only its tail is kept
+STDERR_LIMIT = 64 * 1024
+READ_SIZE = 64 * 1024
+# InputWriter collects small writes up to this many bytes and sends them with a single system call
+WRITE_BUFFER_SIZE = 64 * 1024
+# the number of items of an iterable InputWriter joins before writing them
+WRITE_BATCH_SIZE = 1024
+# the number of seconds the input pipe of a TextEntry with the 'drop' policy must stay full before chunks are dropped,
+# so that a reader that keeps up but is scheduled late loses nothing
+OVERFLOW_GRACE = 0.1
+# the default number of times per second ProgressBar.track refreshes the bar
+TRACK_REFRESH_RATE = 10
+# the size of the buffer copy_with_progress reads into, and of each sendfile call
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class _PipeMultiplexer:
+    """
+    Drains the standard output and standard error of many zenity processes at the same time from a single thread
+    using selectors, so that a process never blocks on a full pipe no matter when (or whether) its output is read
+    """
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+        os.set_blocking(self._wakeup_write, False)
+        self._selector.register(self._wakeup_read, selectors.EVENT_READ, None)
+
+    def register(self, dialogue):
+        """
+        Start draining the pipes of a started dialogue. Safe to call from any thread
+        :param dialogue: the started dialogue
+        """
+        with self._lock:
+            self._pending.append(dialogue)
+        try:
+            os.write(self._wakeup_write, b'\0')
+        except BlockingIOError:
+            # the poller has already been woken up
+            pass
+
+    def _register_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for dialogue in pending:
+            process = dialogue.zenity_process
+            for pipe, is_stderr in ((process.stdout, False), (process.stderr, True)):
+                os.set_blocking(pipe.fileno(), False)
+                self._selector.register(pipe, selectors.EVENT_READ, (weakref.ref(dialogue), is_stderr))
+
+    def poll(self, timeout=None):
+        """
+        Wait until at least one of the pipes is readable and read everything that is available
+        :param timeout: the maximum number of seconds to wait, None to wait forever
+        :return: a list of the dialogues whose pipes were all closed during this poll
+        """
+        self._register_pending()
+        completed = []
+        for key, _ in self._selector.select(timeout):
+            if key.data is None:
+                try:
+                    os.read(self._wakeup_read, READ_SIZE)
+                except BlockingIOError:
+                    pass
+                continue
+            dialogue_reference, is_stderr = key.data
+            dialogue = dialogue_reference()
+            try:
+                data = os.read(key.fd, READ_SIZE)
+            except BlockingIOError:
+                continue
+            if data:
+                if dialogue is not None:
+                    dialogue._receive(data, is_stderr)
+            else:
+                self._selector.unregister(key.fileobj)
+                key.fileobj.close()
+                # an abandoned dialogue that was garbage collected only needs its pipes closed
+                if dialogue is not None and dialogue._pipe_closed(is_stderr):
+                    completed.append(dialogue)
+        return completed
+
+    def run_forever(self):
+        while True:
+            self.poll()
+
+    def close(self):
+        """
+        Close the selector, the wakeup pipe and every output pipe that is still registered. Only for multiplexers that
+        are polled by their owner - the shared multiplexer lives as long as the process
+        """
+        if self._selector is None:
+            return
+        self._register_pending()
+        for key in list(self._selector.get_map().values()):
+            if key.data is None:
+                continue
+            key.fileobj.close()
+            dialogue_reference, is_stderr = key.data
+            dialogue = dialogue_reference()
+            if dialogue is not None:
+                # nothing will drain this pipe anymore, so a later wait must not poll for it
+                dialogue._pipe_closed(is_stderr)
+        self._selector.close()
+        self._selector = None
+        os.close(self._wakeup_read)
+        os.close(self._wakeup_write)
+
+
+def _wait_ready(file, events, timeout=None):
+    """
+    Wait until a file is ready - with a selector, since select.select fails for descriptors above FD_SETSIZE, which
+    many concurrent dialogues easily reach
+    :param file: a file object or descriptor
+    :param events: selectors.EVENT_READ or selectors.EVENT_WRITE
+    :param timeout: the maximum number of seconds to wait, None to wait forever
+    :return: whether the file became ready before the timeout
+    """
+    with selectors.DefaultSelector() as selector:
+        selector.register(file, events)
+        return bool(selector.select(timeout))
+
+
+async def _aiterate(iterable):
+    """
+    Adapt a regular iterable to an asynchronous one
+    """
+    for item in iterable:
+        yield item
+
+
+_running_processes = weakref.WeakSet()
+
+
+def _reap_process(process):
+    """
+    Make sure a zenity process has exited and its standard input is closed - terminating it, and killing it if it
+    doesn't exit within STOP_GRACE seconds. Its output pipes are closed by the multiplexer once they are drained
+    :param process: the subprocess object
+    :return: the return code of the process
+    """
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(STOP_GRACE)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    if process.stdin is not None:
+        try:
+            process.stdin.close()
+        except OSError:
+            # unflushed input to a dead process
+            pass
+    _running_processes.discard(process)
+    return process.returncode
+
+
+def reap_all():
+    """
+    Stop every zenity process started by this module that is still running. Called automatically at exit
+    """
+    for process in list(_running_processes):
+        _reap_process(process)
+
+
+atexit.register(reap_all)
+
+
+class InputWriter:
+    """
+    A buffered, binary safe writer to the standard input of a zenity process, created by
+    BaseZenityDialogue.input_writer. Small writes are encoded and copied into a single preallocated buffer that is
+    reused for the life of the writer, and sent with one system call when it fills up or on flush - a chunk too large
+    for the buffer is sent together with the buffered data in a single vectored write, without being copied. The items
+    of an iterable are joined in batches before they are written.
+    When the user closes the dialogue mid-stream the writer is marked broken and discards further input instead of
+    raising BrokenPipeError. The writer is safe to share between threads
+    """
+    def __init__(self, dialogue, buffer_size=WRITE_BUFFER_SIZE):
+        """
+        :param dialogue: a started dialogue that reads its standard input
+        :param buffer_size: the number of bytes buffered before they are written, 0 writes every chunk immediately
+        """
+        self._dialogue = dialogue
+        self._stdin = dialogue.zenity_process.stdin
+        if self._stdin is None:
+            raise ZenityError('the dialogue does not read its standard input')
+        self._buffer = bytearray(buffer_size)
+        self._buffer_size = buffer_size
+        self._filled = 0
+        self._lock = threading.Lock()
+        self.bytes_written = 0
+        self.broken = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, data):
+        """
+        Write data to the dialogue, buffering it if it fits in the buffer
+        :param data: a str (encoded as UTF-8), a bytes-like object or an iterable of them
+        :return: False if the dialogue no longer reads its input (the data was discarded), True otherwise
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        elif isinstance(data, memoryview):
+            data = data.cast('B')
+        elif not isinstance(data, (bytes, bytearray)):
+            return self._write_iterable(data)
+        with self._lock:
+            if self.broken:
+                return False
+            end = self._filled + len(data)
+            if end < self._buffer_size:
+                self._buffer[self._filled:end] = data
+                self._filled = end
+            else:
+                self._flush(memoryview(data))
+            return not self.broken
+
+    def _write_iterable(self, iterable):
+        """
+        Write the items of an iterable in batches, joining every batch into a single bytes object so that the per item
+        work is done by bytes.join rather than by write
+        """
+        iterator = iter(iterable)
+        while True:
+            batch = list(itertools.islice(iterator, WRITE_BATCH_SIZE))
+            if not batch:
+                return True
+            try:
+                joined = b''.join(batch)
+            except TypeError:
+                joined = b''.join(item.encode('utf-8') if isinstance(item, str) else item for item in batch)
+            if not self.write(joined):
+                return False
+
+    def flush(self):
+        """
+        Write the buffered data to the dialogue
+        :return: False if the dialogue no longer reads its input, True otherwise
+        """
+        with self._lock:
+            self._flush()
+            return not self.broken
+
+    def close(self):
+        """
+        Flush the buffered data and close the standard input of the dialogue, which ends the input of lists, progress
+        bars and text entries
+        """
+        with self._lock:
+            self._flush()
+            try:
+                self._stdin.close()
+            except BrokenPipeError:
+                pass
+
+    def _flush(self, extra=None):
+        """
+        Write the buffered data followed by extra, with the lock held
+        :param extra: a memoryview of bytes to write after the buffer, or None
+        """
+        if self.broken:
+            return
+        with memoryview(self._buffer) as buffer:
+            chunks = [chunk for chunk in (buffer[:self._filled], extra) if chunk is not None and len(chunk)]
+            try:
+                # data written with send_input may still be in the buffer of the pipe object
+                self._stdin.flush()
+                self._write_chunks(chunks)
+            except (BrokenPipeError, ValueError):
+                # the user closed the dialogue, or its standard input was closed
+                self.broken = True
+            finally:
+                chunks.clear()
+        self._filled = 0
+
+    def _write_chunks(self, chunks):
+        fd = self._stdin.fileno()
+        while chunks:
+            if hasattr(os, 'writev'):
+                written = os.writev(fd, chunks)
+            else:
+                written = os.write(fd, chunks[0])
+            self.bytes_written += written
+            self._dialogue.bytes_in += written
+            # drop what was written, a write to a pipe is only partial if interrupted by a signal
+            while chunks and written >= len(chunks[0]):
+                written -= len(chunks.pop(0))
+            if written:
+                chunks[0] = chunks[0][written:]
+
+
+_default_multiplexer: Union[_PipeMultiplexer, None] = None
+_default_multiplexer_lock = threading.Lock()
+
+
+def _get_default_multiplexer():
+    """
+    :return: the module wide multiplexer, drained by a background daemon thread that is started on first use
+    """
+    global _default_multiplexer
+    with _default_multiplexer_lock:
+        if _default_multiplexer is None:
+            _default_multiplexer = _PipeMultiplexer()
+            threading.Thread(target=_default_multiplexer.run_forever, name='zenity-pipe-drainer',
+                             daemon=True).start()
+    return _default_multiplexer
+
+
 class BaseZenityDialogue:
     """
     A class representing a base zenity dialogue with the attributes common to all zenity dialogues - height, width
     Should not be instantiated as it does not have a dialogue type
     """
-    def __init__(self, window_icon=None, ok_label=None, cancel_label=None, width=None, height=None):
+    # whether the dialogue reads its standard input, dialogues that don't are started without a stdin pipe
+    uses_stdin = True
+    # the buffer size of the InputWriter that writes the input stream, 0 for input zenity should show immediately
+    input_buffer_size = WRITE_BUFFER_SIZE
+    # the labels of the extra buttons added with add_extra_button
+    extra_buttons = ()
+
+    def __init__(self, window_icon=None, ok_label=None, cancel_label=None, width=None, height=None, timeout=None):
         self.arguments = ['zenity']
-        self.zenity_process: Union[subprocess.Popen, None] = None
         if ok_label is not None:
             self.arguments.append(f'--ok-label={ok_label}')
         if cancel_label is not None:
@@ -69,27 +524,336 @@ class BaseZenityDialogue:
             self.arguments.append(f'--width={width}')
         if height is not None:
             self.arguments.append(f'--height={height}')
+        if timeout is not None:
+            self.arguments.append(f'--timeout={timeout}')
+        self._reset_state()
+
+    def _reset_state(self):
+        """
+        Initialise the state of a single run of the dialogue, as opposed to its configuration
+        """
+        self.zenity_process: Union[subprocess.Popen, None] = None
         self.output = ''
+        self._input_thread: Union[threading.Thread, None] = None
+        self._input_error: Union[Exception, None] = None
+        self._multiplexer: Union[_PipeMultiplexer, None] = None
+        self._stdout_data = bytearray()
+        self._stderr_data = bytearray()
+        self._open_pipes = set()
+        self._io_condition = threading.Condition()
+        self._output_decoded = False
+        self._async_tasks = []
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._exit_reported = False
+        self.exit_code = None
 
-    def run(self):
+    def _clone(self):
+        """
+        :return: a new, unstarted, dialogue with the same configuration as this one
+        """
+        clone = object.__new__(type(self))
+        clone.__dict__.update(self.__dict__)
+        clone.arguments = list(self.arguments)
+        clone._reset_state()
+        return clone
+
+    def add_extra_button(self, label):
+        """
+        Add a button next to the ok and cancel buttons, see get_pressed_button
+        :param label: the label of the button
+        """
+        self.extra_buttons += (label,)
+        self.arguments.append(f'--extra-button={label}')
+
+    def get_pressed_button(self):
+        """
+        zenity closes the dialogue when an extra button is pressed, printing its label instead of the answer
+        :return: the label of the extra button that closed the dialogue, or None if it was closed with ok or cancel
+        """
+        self.get_output()
+        if self.exit_code != 1:
+            return None
+        label = self.output.rstrip('\n')
+        return label if label in self.extra_buttons else None
+
+    def __enter__(self):
+        """
+        Start the dialogue, if it has not been started yet. When the block exits the process is stopped if it is
+        still running and its pipes are closed
+        """
+        if self.zenity_process is None:
+            self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.zenity_process is None:
+            return
+        if self._started_by_astart():
+            # the event loop owns the pipes of the process, only signal it - astop also waits for it
+            if self.zenity_process.returncode is None:
+                self.zenity_process.terminate()
+        elif self.zenity_process.poll() is None:
+            self.stop()
+        else:
+            _reap_process(self.zenity_process)
+
+    def run(self, timeout=None):
         """
         This function will run the zenity command and wait for it to complete
+        :param timeout: the maximum number of seconds to wait, see wait
+        :return: the exit code of the zenity command
         """
-        self.start()
-        self.wait()
+        if self.zenity_process is None:
+            self.start()
+        return self.wait(timeout)
 
-    def wait(self):
+    def wait(self, timeout=None):
         """
         This function will wait for the running zenity command to complete
+        :param timeout: the maximum number of seconds to wait, after which the process is stopped and ZenityTimeout
+        is raised. None to wait forever
         :return: the exit code of the zenity command
         """
-        self.output += self.zenity_process.stdout.read().decode()
-        exit_code = self.zenity_process.wait()
-        if exit_code not in (0, 1):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if self._multiplexer is not None:
+            completed = self._poll_until_drained(deadline)
+        else:
+            with self._io_condition:
+                completed = self._io_condition.wait_for(lambda: not self._open_pipes, timeout)
+        try:
+            if not completed:
+                raise subprocess.TimeoutExpired(self.arguments, timeout)
+            exit_code = self.zenity_process.wait(None if deadline is None else max(deadline - time.monotonic(), 0))
+        except subprocess.TimeoutExpired:
+            self.stop()
+            raise ZenityTimeout(f'zenity did not complete within {timeout} seconds') from None
+        if self._input_thread is not None:
+            self._input_thread.join()
+        return self._finish(exit_code)
+
+    def _poll_until_drained(self, deadline):
+        """
+        Drive the private multiplexer of a dialogue in a DialogueGroup from this thread until the dialogue's output
+        pipes are closed
+        :param deadline: the time.monotonic() deadline, or None to poll forever
+        :return: whether the pipes were closed before the deadline
+        """
+        while self._open_pipes:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            self._multiplexer.poll(remaining)
+        return True
+
+    def _finish(self, exit_code):
+        """
+        Decode the output of the finished zenity process and raise an error if it failed
+        :param exit_code: the exit code of the zenity process
+        :return: the exit code of the zenity process
+        """
+        if not self._output_decoded:
+            self.output = self._stdout_data.decode()
+            self._output_decoded = True
+        self.exit_code = exit_code
+        self._report_exit(exit_code)
+        if self._input_error is not None:
+            error, self._input_error = self._input_error, None
+            raise error
+        if exit_code not in ANSWER_EXIT_CODES:
             raise ZenityError(
-                f'zenity process failed. stdout: {self.output}, stderr: {self.zenity_process.stderr.read().decode()}')
+                f'zenity process failed. stdout: {self.output}, stderr: {self.get_errors()}')
+        return exit_code
+
+    def _emit(self, kind, exit_code=None):
+        """
+        Send a lifecycle event to the registered observers
+        :param kind: the kind of the event
+        :param exit_code: the exit code, for exit events
+        """
+        observers = _observers
+        if observers:
+            event = DialogueEvent(kind, self, time.monotonic(), exit_code, self.bytes_in, self.bytes_out)
+            for observer in observers:
+                observer(event)
+
+    def _report_exit(self, exit_code, kind='exit'):
+        if not self._exit_reported:
+            self._exit_reported = True
+            if _observers:
+                self._emit(kind, exit_code)
+
+    async def arun(self, timeout=None):
+        """
+        The asyncio equivalent of run - start the zenity process and wait for it to complete without blocking the loop
+        :param timeout: the maximum number of seconds to wait, see await_completion
+        :return: the exit code of the zenity command
+        """
+        await self.astart()
+        return await self.await_completion(timeout)
+
+    async def astart(self):
+        """
+        The asyncio equivalent of start. A dialogue started this way must be driven with the asynchronous methods
+        """
+        if _observers:
+            self._emit('start')
+        command = self._command()
+        self.zenity_process = await asyncio.create_subprocess_exec(resolve_executable(command[0]), *command[1:],
+                                                                   stdout=asyncio.subprocess.PIPE,
+                                                                   stdin=asyncio.subprocess.PIPE if self.uses_stdin
+                                                                   else asyncio.subprocess.DEVNULL,
+                                                                   stderr=asyncio.subprocess.PIPE)
+        if _observers:
+            self._emit('spawned')
+        self._open_pipes = {'stdout', 'stderr'}
+        self._async_tasks = [asyncio.create_task(self._adrain(self.zenity_process.stdout, False)),
+                             asyncio.create_task(self._adrain(self.zenity_process.stderr, True))]
+        input_stream = self._ainput_stream()
+        if input_stream is not None:
+            self._async_tasks.append(asyncio.create_task(self._afeed_input(input_stream)))
+
+    async def await_completion(self, timeout=None):
+        """
+        The asyncio equivalent of wait - wait for the zenity process started by astart to complete
+        :param timeout: the maximum number of seconds to wait, after which the process is stopped and ZenityTimeout
+        is raised. None to wait forever
+        :return: the exit code of the zenity command
+        """
+        async def complete():
+            await asyncio.gather(*self._async_tasks)
+            return await self.zenity_process.wait()
+
+        try:
+            exit_code = await asyncio.wait_for(complete(), timeout)
+        except asyncio.TimeoutError:
+            await self.astop()
+            raise ZenityTimeout(f'zenity did not complete within {timeout} seconds') from None
+        return self._finish(exit_code)
+
+    async def asend_input(self, input_to_send):
+        """
+        The asyncio equivalent of send_input - waits until the pipe has room instead of blocking the loop
+        :param input_to_send: the input to send to the program
+        """
+        if isinstance(input_to_send, str):
+            input_to_send = input_to_send.encode('utf-8')
+        self.zenity_process.stdin.write(input_to_send)
+        self.bytes_in += len(input_to_send)
+        await self.zenity_process.stdin.drain()
+
+    async def astop(self):
+        """
+        The asyncio equivalent of stop
+        :return: the return code of the process
+        """
+        if self.zenity_process.returncode is None:
+            self.zenity_process.terminate()
+            try:
+                await asyncio.wait_for(self.zenity_process.wait(), STOP_GRACE)
+            except asyncio.TimeoutError:
+                self.zenity_process.kill()
+        exit_code = await self.zenity_process.wait()
+        if self.zenity_process.stdin is not None:
+            self.zenity_process.stdin.close()
+        self._report_exit(exit_code, 'stop')
         return exit_code
 
+    async def aget_output(self):
+        """
+        The asyncio equivalent of get_output - wait for the zenity process to complete and return its output
+        :return: the resulting string
+        """
+        await self.await_completion()
+        return self.output
+
+    async def _adrain(self, stream, is_stderr):
+        while True:
+            data = await stream.read(READ_SIZE)
+            if not data:
+                break
+            self._receive(data, is_stderr)
+        self._pipe_closed(is_stderr)
+
+    async def _afeed_input(self, input_stream):
+        """
+        The asyncio equivalent of _feed_input, runs as a task on the loop instead of in a thread
+        :param input_stream: an iterable or an asynchronous iterable of bytes to write
+        """
+        stdin = self.zenity_process.stdin
+        if not hasattr(input_stream, '__aiter__'):
+            input_stream = _aiterate(input_stream)
+        try:
+            async for chunk in input_stream:
+                stdin.write(chunk)
+                self.bytes_in += len(chunk)
+                await stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # the user closed the dialogue before all of the input was written
+            pass
+        except Exception as error:
+            self._input_error = error
+            self.zenity_process.terminate()
+        finally:
+            stdin.close()
+
+    def _receive(self, data, is_stderr):
+        """
+        Called by the multiplexer with data read from one of the output pipes of the zenity process
+        :param data: the bytes that were read
+        :param is_stderr: whether the data was read from standard error or from standard output
+        """
+        with self._io_condition:
+            if is_stderr:
+                self._stderr_data += data
+                if len(self._stderr_data) > STDERR_LIMIT:
+                    del self._stderr_data[:-STDERR_LIMIT]
+            else:
+                first_output = not self._stdout_data
+                self._stdout_data += data
+                self.bytes_out += len(data)
+                if first_output and _observers:
+                    self._emit('first_output')
+            self._io_condition.notify_all()
+
+    def _pipe_closed(self, is_stderr):
+        """
+        Called by the multiplexer when one of the output pipes of the zenity process reaches end of file
+        :param is_stderr: whether standard error or standard output was closed
+        :return: whether all of the output pipes are now closed
+        """
+        with self._io_condition:
+            self._open_pipes.discard('stderr' if is_stderr else 'stdout')
+            self._io_condition.notify_all()
+            return not self._open_pipes
+
+    def iter_output(self):
+        """
+        A generator yielding the standard output of the zenity process as it arrives, until the process closes it
+        """
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        position = 0
+        while True:
+            with self._io_condition:
+                self._io_condition.wait_for(
+                    lambda: len(self._stdout_data) > position or 'stdout' not in self._open_pipes)
+                chunk = bytes(self._stdout_data[position:])
+                finished = 'stdout' not in self._open_pipes
+            position += len(chunk)
+            text = decoder.decode(chunk, final=finished)
+            if text:
+                yield text
+            if finished:
+                return
+
+    def get_errors(self):
+        """
+        Read the end of the standard error of the zenity process
+        :return: the last STDERR_LIMIT bytes of standard error, decoded
+        """
+        with self._io_condition:
+            return self._stderr_data.decode(errors='replace')
+
     def send_input(self, input_to_send):
         """
         This function will write input to the standard input of the zenity process
@@ -99,39 +863,139 @@ class BaseZenityDialogue:
             input_to_send = input_to_send.encode('utf-8')
         self.zenity_process.stdin.write(input_to_send)
         self.zenity_process.stdin.flush()
+        self.bytes_in += len(input_to_send)
+
+    def input_writer(self, buffer_size=WRITE_BUFFER_SIZE):
+        """
+        This function will create a buffered writer to the standard input of the started zenity process, for bulk
+        input such as many list rows or progress lines - see InputWriter
+        :param buffer_size: the number of bytes buffered before they are written
+        :return: an InputWriter
+        """
+        return InputWriter(self, buffer_size)
 
     def start(self):
         """
         This function will start the zenity process and immediately return without waiting for it
         in order to allow running zenity command asynchronously - for example progress bars
         """
-        self.zenity_process = run_local_command(self.arguments, wait=False)
+        if _observers:
+            self._emit('start')
+        self.zenity_process = run_local_command(self._command(), wait=False, stdin=self.uses_stdin)
+        if _observers:
+            self._emit('spawned')
+        # reap the process if the dialogue is abandoned, and at interpreter exit
+        weakref.finalize(self, _reap_process, self.zenity_process)
+        _running_processes.add(self.zenity_process)
+        self._open_pipes = {'stdout', 'stderr'}
+        (self._multiplexer or _get_default_multiplexer()).register(self)
+        input_stream = self._input_stream()
+        if input_stream is not None:
+            self._input_thread = threading.Thread(target=self._feed_input, args=(input_stream,), daemon=True)
+            self._input_thread.start()
+
+    def _command(self):
+        """
+        :return: the command that runs this dialogue with the current backend
+        """
+        return _backend + self.arguments[1:]
+
+    def _input_stream(self):
+        """
+        Data that should be written to the standard input of the zenity process as soon as it starts
+        :return: an iterable of bytes, or None if the dialogue does not read its standard input
+        """
+        return None
+
+    def _ainput_stream(self):
+        """
+        The data astart writes to the standard input of the zenity process, the same as _input_stream by default
+        :return: an iterable or an asynchronous iterable of bytes, or None if the dialogue does not read its input
+        """
+        return self._input_stream()
+
+    def _feed_input(self, input_stream):
+        """
+        This function runs in a background thread, writes the input stream to the zenity process and then closes
+        its standard input. An error raised by the stream terminates the process and is re-raised by wait()
+        :param input_stream: an iterable of bytes to write
+        """
+        writer = self.input_writer(self.input_buffer_size)
+        try:
+            if self.input_buffer_size:
+                writer.write(input_stream)
+            else:
+                for chunk in input_stream:
+                    if not writer.write(chunk):
+                        # the user closed the dialogue before all of the input was written
+                        break
+        except Exception as error:
+            self._input_error = error
+            self.zenity_process.terminate()
+        finally:
+            writer.close()
 
     def stop(self):
         """
-        Stop the zenity process
+        Stop the zenity process - terminate it, kill it if it doesn't exit within STOP_GRACE seconds, and close its
+        standard input
         :return: the return code of the process
         """
-        self.zenity_process.terminate()
-        return self.zenity_process.wait()
+        exit_code = _reap_process(self.zenity_process)
+        self._report_exit(exit_code, 'stop')
+        return exit_code
 
     def get_output(self):
         """
         Read the standard output of the zenity process
         :return: the resulting string
         """
-        if self.zenity_process.poll() is not None:
+        if self.exit_code is not None or self.zenity_process is None:
+            return self.output
+        if self._started_by_astart():
+            if self.zenity_process.returncode is not None:
+                raise ZenityError('the dialogue was started with astart, read its output with aget_output')
+        elif self.zenity_process.poll() is not None:
             self.wait()
         return self.output
 
+    def _started_by_astart(self):
+        """
+        :return: whether the zenity process is an asyncio process, which only the asynchronous methods can drive
+        """
+        return isinstance(self.zenity_process, asyncio.subprocess.Process)
+
+    def get_result(self):
+        """
+        Parse the output of the zenity process into a python value, subclasses return a value of the matching type
+        :return: the output without its trailing newline, or None if the dialogue was cancelled or is still running
+        """
+        view = self._result_view()
+        return None if view is None else str(view, 'utf-8')
+
+    def _result_view(self):
+        """
+        :return: a memoryview of the raw standard output without its trailing newline, without copying it, or None if
+        the dialogue was cancelled or is still running
+        """
+        self.get_output()
+        if self.exit_code != 0:
+            return None
+        view = memoryview(self._stdout_data)
+        if view[-1:] == b'\n':
+            view = view[:-1]
+        return view
+
 
 class DateSelection(BaseZenityDialogue):
     """
     A class representing the zenity date selection option
     """
+    uses_stdin = False
+
     def __init__(self, text=None, title=None, starting_date: datetime.date = None, window_icon=None, ok_label=None,
-                 cancel_label=None, width=None, height=None):
-        super().__init__(window_icon, ok_label, cancel_label, width, height)
+                 cancel_label=None, width=None, height=None, timeout=None):
+        super().__init__(window_icon, ok_label, cancel_label, width, height, timeout=timeout)
         self.arguments.extend(['--calendar', '--date-format=%d/%m/%Y'])
         if text is not None:
             self.arguments.append(f'--text={text}')
@@ -142,11 +1006,22 @@ class DateSelection(BaseZenityDialogue):
             self.arguments.append(f'--month={starting_date.month}')
             self.arguments.append(f'--year={starting_date.year}')
 
+    def get_result(self):
+        """
+        :return: the selected datetime.date, or None if the dialogue was cancelled
+        """
+        view = self._result_view()
+        if view is None:
+            return None
+        return datetime.datetime.strptime(str(view, 'ascii'), '%d/%m/%Y').date()
+
 
 class FileSelection(BaseZenityDialogue):
+    uses_stdin = False
+
     def __init__(self, multiple=False, separator='|', directory=False, new=False, window_icon=None, width=None,
-                 height=None):
-        super().__init__(window_icon, None, None, width, height)
+                 height=None, timeout=None):
+        super().__init__(window_icon, None, None, width, height, timeout=timeout)
         self.arguments.append('--file-selection')
         if multiple:
             self.arguments.append('--multiple')
@@ -155,20 +1030,176 @@ class FileSelection(BaseZenityDialogue):
             self.arguments.append('--directory')
         if new:
             self.arguments.append('--save')
+        self.multiple = multiple
+        self.separator = separator
+
+    def get_result(self):
+        """
+        :return: the selected pathlib.Path, or for multiple selections a lazily split sequence of pathlib.Path.
+        None if the dialogue was cancelled
+        """
+        view = self._result_view()
+        if view is None:
+            return None
+        if not self.multiple:
+            return pathlib.Path(str(view, sys.getfilesystemencoding(), 'surrogateescape'))
+        return _PathList(self._stdout_data, len(view), self.separator.encode())
+
+
+class _PathList(Sequence):
+    """
+    The paths selected in a multiple FileSelection, split lazily out of zenity's raw output.
+    zenity returns absolute paths, so only a separator followed by a slash ends a path - a separator character inside
+    a file name is kept. Each path is decoded when it is first accessed
+    """
+    def __init__(self, data, end, separator):
+        self._data = data
+        self._end = end
+        self._separator = separator + b'/'
+        self._starts = None
+
+    def _split(self):
+        if self._starts is None:
+            starts = [0]
+            position = self._data.find(self._separator, 0, self._end)
+            while position != -1:
+                starts.append(position + len(self._separator) - 1)
+                position = self._data.find(self._separator, position + 1, self._end)
+            self._starts = starts
+        return self._starts
+
+    def __len__(self):
+        return len(self._split()) if self._end else 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        starts = self._split()
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('path index out of range')
+        end = starts[index + 1] - len(self._separator) + 1 if index + 1 < len(starts) else self._end
+        return pathlib.Path(self._data[starts[index]:end].decode(sys.getfilesystemencoding(), 'surrogateescape'))
+
+    def __repr__(self):
+        return f'{type(self).__name__}({list(self)!r})'
 
 
 class Notification(BaseZenityDialogue):
-    def __init__(self, text=None, window_icon=None, ok_label=None, cancel_label=None, width=None, height=None):
-        super().__init__(window_icon, ok_label, cancel_label, width, height)
+    def __init__(self, text=None, window_icon=None, ok_label=None, cancel_label=None, width=None, height=None,
+                 listen=False, timeout=None):
+        super().__init__(window_icon, ok_label, cancel_label, width, height, timeout=timeout)
         self.arguments.append('--notification')
         if text is not None:
             self.arguments.append(f'--text={text}')
+        if listen:
+            self.arguments.append('--listen')
+        self.uses_stdin = listen
+
+
+class NotificationDaemon:
+    """
+    A long lived notifier - a single zenity --notification --listen process that is sent commands over its standard
+    input instead of spawning a process per message. The process is restarted (and its icon, tooltip and visibility
+    restored) if it dies, and the daemon is safe to share between threads
+    """
+    def __init__(self, text=None, window_icon=None):
+        self.text = text
+        self.window_icon = window_icon
+        self._notification: Union[Notification, None] = None
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def message(self, text):
+        """
+        Show a notification message
+        :param text: the message to show
+        """
+        self._send('message', text)
+
+    def tooltip(self, text):
+        """
+        Set the tooltip of the notification icon
+        :param text: the new tooltip
+        """
+        self._send('tooltip', text)
+
+    def icon(self, path):
+        """
+        Set the notification icon
+        :param path: the path of the icon, or a stock icon name
+        """
+        self._send('icon', path)
+
+    def visible(self, is_visible):
+        """
+        Show or hide the notification icon
+        :param is_visible: whether the icon should be visible
+        """
+        self._send('visible', 'true' if is_visible else 'false')
+
+    def close(self):
+        """
+        Stop the zenity process
+        """
+        with self._lock:
+            if self._notification is not None:
+                try:
+                    self._notification.zenity_process.stdin.close()
+                except BrokenPipeError:
+                    pass
+                self._notification.stop()
+                self._notification = None
+
+    def _ensure_running(self):
+        if self._notification is not None and self._notification.zenity_process.poll() is None:
+            return
+        if self._notification is not None:
+            try:
+                self._notification.wait()
+            except ZenityError:
+                pass
+        self._notification = Notification(text=self.text, window_icon=self.window_icon, listen=True)
+        self._notification.start()
+        for command, value in self._state.items():
+            self._notification.send_input(f'{command}:{value}\n')
+
+    def _send(self, command, value):
+        value = str(value).replace('\n', '\\n')
+        with self._lock:
+            try:
+                self._ensure_running()
+                self._notification.send_input(f'{command}:{value}\n')
+            except BrokenPipeError:
+                # the process died since it was checked, start a new one and try again
+                self._ensure_running()
+                self._notification.send_input(f'{command}:{value}\n')
+            if command != 'message':
+                self._state[command] = value
 
 
 class List(BaseZenityDialogue):
+    """
+    A class representing the zenity list option
+    When stream_rows is set, rows may be any iterable (including a generator) and is consumed lazily - the rows are
+    written to the standard input of zenity while the dialogue is open instead of being passed on the command line
+    """
     def __init__(self, column_names, editable=False, select_col=None, list_dialogue_type=None, separator='|', rows=None,
-                 title=None, text=None, window_icon=None, ok_label=None, cancel_label=None, width=None, height=None):
-        super().__init__(window_icon, ok_label, cancel_label, width, height)
+                 title=None, text=None, window_icon=None, ok_label=None, cancel_label=None, width=None, height=None,
+                 stream_rows=False, timeout=None, extra_buttons=None):
+        super().__init__(window_icon, ok_label, cancel_label, width, height, timeout=timeout)
+        self.column_count = len(column_names)
+        self.streamed_rows = None
+        self.separator = separator
+        self.select_col = select_col
+        self.list_dialogue_type = list_dialogue_type
         self.arguments.append('--list')
         for column_name in column_names:
             self.arguments.append(f'--column={column_name}')
@@ -185,19 +1216,296 @@ class List(BaseZenityDialogue):
             if list_dialogue_type not in ('checklist', 'radiolist'):
                 raise ZenityError(f'{list_dialogue_type} is not a valid list dialogue type')
             self.arguments.append(f'--{list_dialogue_type}')
+        for label in extra_buttons or ():
+            self.add_extra_button(label)
 
         if rows is not None:
-            for row in rows:
-                if len(row) != len(column_names):
-                    raise ZenityError(f"row: {row}, has the wrong number of items")
-                for item in row:
-                    self.arguments.append(str(item))
+            if stream_rows:
+                self.streamed_rows = rows
+            else:
+                for row in rows:
+                    if len(row) != len(column_names):
+                        raise ZenityError(f"row: {row}, has the wrong number of items")
+                    for item in row:
+                        self.arguments.append(str(item))
+
+    def get_result(self):
+        """
+        Split the selection into rows, honoring select_col - a row holds every column (except the check box column of
+        checklists and radiolists) for 'ALL', the listed columns for e.g. '1,3', and the first column by default
+        :return: a list of tuples of strings, one per selected row, or None if the dialogue was cancelled
+        """
+        view = self._result_view()
+        if view is None:
+            return None
+        if not view:
+            return []
+        values = str(view, 'utf-8').split(self.separator)
+        if self.select_col == 'ALL':
+            width = self.column_count - (self.list_dialogue_type is not None)
+        elif self.select_col is not None:
+            width = len(str(self.select_col).split(','))
+        else:
+            width = 1
+        return [tuple(values[index:index + width]) for index in range(0, len(values), width)]
+
+    def _input_stream(self):
+        if self.streamed_rows is None:
+            return None
+        return self._encode_rows(self.streamed_rows)
+
+    def _encode_rows(self, rows):
+        """
+        Lazily validate and encode the rows as newline delimited cells, the format zenity reads from standard input.
+        A cell containing a line break would be read as two cells, shifting every following cell, so it is refused
+        :param rows: an iterable of rows
+        :return: a generator of encoded rows
+        """
+        for row in rows:
+            if len(row) != self.column_count:
+                raise ZenityError(f"row: {row}, has the wrong number of items")
+            cells = [str(item) for item in row]
+            if any('\n' in cell or '\r' in cell for cell in cells):
+                raise ZenityError(f'row: {row}, has a line break in a cell, which can\'t be streamed')
+            yield ''.join(f'{cell}\n' for cell in cells).encode('utf-8')
+
+
+class PagedList:
+    """
+    A List over a dataset too large to show at once - a page of rows is shown at a time, with extra buttons to move to
+    the next and previous pages and to search. Pages are fetched lazily from the source, so opening the list takes the
+    same time regardless of the size of the dataset.
+    The source is either a sequence (only the sliced page is read) or a function fetch(offset, limit) returning up to
+    limit rows starting at offset, e.g. for sqlite:
+        lambda offset, limit: connection.execute('SELECT id, name FROM users ORDER BY id LIMIT ? OFFSET ?',
+                                                 (limit, offset)).fetchall()
+    Only the selection made on the page that was accepted is returned
+    """
+    def __init__(self, column_names, source, page_size=1000, search=None, select_col=None, list_dialogue_type=None,
+                 separator='|', title=None, text=None, window_icon=None, ok_label=None, cancel_label=None,
+                 width=None, height=None, timeout=None, next_label='Next', previous_label='Previous',
+                 search_label='Search'):
+        """
+        :param source: a sequence of rows, or a function fetch(offset, limit) returning a list of rows
+        :param page_size: the number of rows shown at a time
+        :param search: a function search(query, offset) returning the index of the first row at or after offset that
+        matches the query, or None. A sorted key index can implement it with bisect. Defaults to a scan of a sequence
+        source for a cell containing the query, and to no search button for a function source
+        """
+        if page_size < 1:
+            raise ZenityError('the page size must be positive')
+        self.column_names = tuple(column_names)
+        self.page_size = page_size
+        if isinstance(source, Sequence):
+            self._fetch = lambda offset, limit: source[offset:offset + limit]
+            if search is None:
+                search = functools.partial(self._scan, source)
+        else:
+            self._fetch = source
+        self._search = search
+        self.next_label = next_label
+        self.previous_label = previous_label
+        self.search_label = search_label
+        self.title = title
+        self.text = text
+        self._list_options = {'select_col': select_col, 'list_dialogue_type': list_dialogue_type,
+                              'separator': separator, 'title': title, 'window_icon': window_icon,
+                              'ok_label': ok_label, 'cancel_label': cancel_label, 'width': width, 'height': height,
+                              'timeout': timeout}
+        self.offset = 0
+        self.page: Union[List, None] = None
+
+    @staticmethod
+    def _scan(rows, query, offset):
+        """
+        The default search of a sequence source - the first row at or after offset with a cell containing the query,
+        ignoring case
+        """
+        query = query.casefold()
+        for index in range(offset, len(rows)):
+            if any(query in str(item).casefold() for item in rows[index]):
+                return index
+        return None
+
+    def _show_page(self, note=None):
+        """
+        Fetch the rows of the current page and show them
+        :param note: a line to show above the text of the list
+        :return: the list dialogue of the page, after it was closed
+        """
+        rows = list(self._fetch(self.offset, self.page_size + 1))
+        has_next = len(rows) > self.page_size
+        del rows[self.page_size:]
+        buttons = []
+        if self.offset > 0:
+            buttons.append(self.previous_label)
+        if has_next:
+            buttons.append(self.next_label)
+        if self._search is not None:
+            buttons.append(self.search_label)
+        position = f'Rows {self.offset + 1}-{self.offset + len(rows)}' if rows else 'No rows'
+        text = '\n'.join(line for line in (note, self.text, position) if line)
+        self.page = List(self.column_names, rows=rows, stream_rows=True, text=text, extra_buttons=buttons,
+                         **self._list_options)
+        self.page.run()
+        return self.page
+
+    def _ask_query(self):
+        entry = SingleLineEntry(text='Search for', title=self.title)
+        entry.run()
+        return entry.get_result()
+
+    def run(self):
+        """
+        Show pages until a selection is accepted or the dialogue is cancelled
+        :return: the exit code of the page the dialogue was closed on
+        """
+        note = None
+        while True:
+            button = self._show_page(note).get_pressed_button()
+            note = None
+            if button is None:
+                return self.page.exit_code
+            if button == self.next_label:
+                self.offset += self.page_size
+            elif button == self.previous_label:
+                self.offset = max(0, self.offset - self.page_size)
+            else:
+                query = self._ask_query()
+                if not query:
+                    continue
+                index = self._search(query, self.offset + 1)
+                if index is None:
+                    index = self._search(query, 0)
+                if index is None:
+                    note = f'No row matches {query}'
+                else:
+                    # the matching row is shown first, so that searching again moves to the next match
+                    self.offset = index
+
+    def get_result(self):
+        """
+        :return: the selection of the page the dialogue was accepted on, see List.get_result, or None if the dialogue
+        was cancelled
+        """
+        return None if self.page is None else self.page.get_result()
+
+
+class Forms(BaseZenityDialogue):
+    """
+    A class representing the zenity forms option, which collects many fields with a single zenity process.
+    Fields are added in display order with the add_* functions and the answers are read with get_values
+    """
+    uses_stdin = False
+
+    def __init__(self, text=None, title=None, separator='|', show_header=False, window_icon=None, ok_label=None,
+                 cancel_label=None, width=None, height=None, timeout=None):
+        super().__init__(window_icon, ok_label, cancel_label, width, height, timeout=timeout)
+        self.arguments.extend(['--forms', '--forms-date-format=%d/%m/%Y'])
+        if text is not None:
+            self.arguments.append(f'--text={text}')
+        if title is not None:
+            self.arguments.append(f'--title={title}')
+        self.arguments.append(f'--separator={separator}')
+        if show_header:
+            self.arguments.append('--show-header')
+        self.separator = separator
+        self.fields = []
+
+    def _clone(self):
+        clone = super()._clone()
+        clone.fields = list(self.fields)
+        return clone
+
+    def _add_field(self, name, field_type, *arguments):
+        if any(field_name == name for field_name, _ in self.fields):
+            raise ZenityError(f'the form already has a field named {name}')
+        self.fields.append((name, field_type))
+        self.arguments.extend(arguments)
+        return self
+
+    def add_entry(self, name):
+        """
+        Add a single line text entry to the form
+        :param name: the name of the field
+        :return: the form, so that calls can be chained
+        """
+        return self._add_field(name, 'entry', f'--add-entry={name}')
+
+    def add_password(self, name):
+        """
+        Add a hidden text entry to the form
+        :param name: the name of the field
+        :return: the form, so that calls can be chained
+        """
+        return self._add_field(name, 'password', f'--add-password={name}')
+
+    def add_calendar(self, name):
+        """
+        Add a calendar to the form, its value is returned as a datetime.date
+        :param name: the name of the field
+        :return: the form, so that calls can be chained
+        """
+        return self._add_field(name, 'calendar', f'--add-calendar={name}')
+
+    def add_list(self, name, values, columns=None):
+        """
+        Add a list to the form
+        :param name: the name of the field and the header of its first column
+        :param values: the cells of the list, row by row
+        :param columns: the names of the columns, for lists with more than one column
+        :return: the form, so that calls can be chained
+        """
+        arguments = [f'--add-list={name}']
+        if columns is not None:
+            arguments.append(f'--column-values={"|".join(str(column) for column in columns)}')
+        arguments.append(f'--list-values={"|".join(str(value) for value in values)}')
+        return self._add_field(name, 'list', *arguments)
+
+    def add_combo(self, name, values):
+        """
+        Add a combo box to the form
+        :param name: the name of the field
+        :param values: the options of the combo box
+        :return: the form, so that calls can be chained
+        """
+        return self._add_field(name, 'combo', f'--add-combo={name}',
+                               f'--combo-values={"|".join(str(value) for value in values)}')
+
+    def get_result(self):
+        """
+        :return: the same as get_values
+        """
+        return self.get_values()
+
+    def get_values(self):
+        """
+        Parse the output of the form
+        :return: a dict from field name to its value - a datetime.date (or None if empty) for calendar fields and a
+        string for any other field, or None if the form was cancelled
+        """
+        output = self.get_output()
+        if self.exit_code != 0:
+            return None
+        if output.endswith('\n'):
+            output = output[:-1]
+        values = output.split(self.separator, len(self.fields) - 1)
+        if len(values) != len(self.fields):
+            raise ZenityError(f'expected {len(self.fields)} form values, got: {output}')
+        result = {}
+        for (name, field_type), value in zip(self.fields, values):
+            if field_type == 'calendar':
+                value = datetime.datetime.strptime(value, '%d/%m/%Y').date() if value else None
+            result[name] = value
+        return result
 
 
 class ZenityMessage(BaseZenityDialogue):
+    uses_stdin = False
+
     def __init__(self, text=None, title=None, window_icon=None, ok_label=None, width=None,
-                 height=None):
-        super().__init__(window_icon, ok_label, None, width, height)
+                 height=None, timeout=None):
+        super().__init__(window_icon, ok_label, None, width, height, timeout=timeout)
         if title is not None:
             self.arguments.append(f'--title={title}')
         if text is not None:
@@ -206,29 +1514,38 @@ class ZenityMessage(BaseZenityDialogue):
 
 class ErrorMessage(ZenityMessage):
     def __init__(self, text=None, title=None, window_icon=None, ok_label=None, width=None,
-                 height=None):
-        super().__init__(text, title, window_icon, ok_label, width, height)
+                 height=None, timeout=None):
+        super().__init__(text, title, window_icon, ok_label, width, height, timeout=timeout)
         self.arguments.append('--error')
 
 
 class WarningMessage(ZenityMessage):
     def __init__(self, text=None, title=None, window_icon=None, ok_label=None, width=None,
-                 height=None):
-        super().__init__(text, title, window_icon, ok_label, width, height)
+                 height=None, timeout=None):
+        super().__init__(text, title, window_icon, ok_label, width, height, timeout=timeout)
         self.arguments.append('--warning')
 
 
 class QuestionMessage(ZenityMessage):
     def __init__(self, text=None, title=None, window_icon=None, ok_label=None, width=None,
-                 height=None):
-        super().__init__(text, title, window_icon, ok_label, width, height)
+                 height=None, timeout=None):
+        super().__init__(text, title, window_icon, ok_label, width, height, timeout=timeout)
         self.arguments.append('--question')
 
+    def get_result(self):
+        """
+        :return: whether the user answered yes, or None if the dialogue is still running
+        """
+        self.get_output()
+        return None if self.exit_code is None else self.exit_code == 0
+
 
 class SingleLineEntry(ZenityMessage):
     def __init__(self, text=None, title=None, entry_text=None, hide_text=False, window_icon=None, ok_label=None,
-                 width=None, height=None):
-        super().__init__(text, title, window_icon, ok_label, width, height)
+                 width=None, height=None, cancel_label=None, timeout=None):
+        super().__init__(text, title, window_icon, ok_label, width, height, timeout=timeout)
+        if cancel_label is not None:
+            self.arguments.append(f'--cancel-label={cancel_label}')
         self.arguments.append('--entry')
         if entry_text is not None:
             self.arguments.append(entry_text)
@@ -237,9 +1554,21 @@ class SingleLineEntry(ZenityMessage):
 
 
 class TextEntry(BaseZenityDialogue):
+    """
+    A class representing the zenity text info option
+    Instead of a filename, the text can be streamed from a source - an iterable of str or bytes, a file object or an
+    asynchronous iterable (when started with astart). With the 'block' overflow policy the source is read only as fast
+    as zenity reads the text, with the 'drop' policy the source is always consumed - when zenity reads too slowly and
+    its pipe stays full for OVERFLOW_GRACE seconds, chunks that don't fit in a buffer of max_buffered_chunks are
+    dropped and counted in dropped_chunks
+    """
+    # streamed text is written as it arrives, so that zenity shows it immediately
+    input_buffer_size = 0
+
     def __init__(self, title=None, filename=None, editable=False, window_icon=None, ok_label=None, cancel_label=None,
-                 width=None, height=None):
-        super().__init__(window_icon, ok_label, cancel_label, width, height)
+                 width=None, height=None, source=None, auto_scroll=False, max_buffered_chunks=64, overflow='block',
+                 timeout=None):
+        super().__init__(window_icon, ok_label, cancel_label, width, height, timeout=timeout)
         self.arguments.append('--text-info')
         if title is not None:
             self.arguments.append(f'--title={title}')
@@ -247,23 +1576,219 @@ class TextEntry(BaseZenityDialogue):
             self.arguments.append(f'--filename={filename}')
         if editable:
             self.arguments.append(f'--editable')
+        if auto_scroll:
+            self.arguments.append('--auto-scroll')
+        if overflow not in ('block', 'drop'):
+            raise ZenityError(f'{overflow} is not a valid overflow policy')
+        self.source = source
+        self.max_buffered_chunks = max_buffered_chunks
+        self.overflow = overflow
+
+    def _reset_state(self):
+        super()._reset_state()
+        self.dropped_chunks = 0
+
+    def _input_stream(self):
+        if self.source is None:
+            return None
+        if hasattr(self.source, '__aiter__'):
+            raise ZenityError('an asynchronous source can only be streamed by astart')
+        return self._read_source()
+
+    def _feed_input(self, input_stream):
+        if self.overflow == 'drop':
+            self._feed_dropping_overflow(input_stream)
+        else:
+            super()._feed_input(input_stream)
+
+    def _ainput_stream(self):
+        if self.source is not None and hasattr(self.source, '__aiter__'):
+            if self.overflow == 'drop':
+                return self._adrop_overflow(self._aread_source())
+            return self._aread_source()
+        return super()._ainput_stream()
+
+    def _read_source(self):
+        if hasattr(self.source, 'read'):
+            chunks = iter(lambda: self.source.read(READ_SIZE), self.source.read(0))
+        else:
+            chunks = self.source
+        for chunk in chunks:
+            yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+
+    async def _aread_source(self):
+        async for chunk in self.source:
+            yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+
+    def _feed_dropping_overflow(self, chunks):
+        """
+        The input thread of the 'drop' policy. A producer thread consumes the chunks into a bounded buffer while this
+        thread writes the buffer to zenity without blocking - a chunk is only dropped when the buffer is full while the
+        pipe has been full for OVERFLOW_GRACE seconds, i.e. when zenity really reads more slowly than the source
+        produces
+        :param chunks: the encoded chunks of the source
+        """
+        stdin = self.zenity_process.stdin
+        buffer = collections.deque()
+        condition = threading.Condition()
+        # full_since is the time the writer found the pipe full, or None while it has room
+        state = {'full_since': None, 'finished': False, 'stopped': False, 'error': None}
+
+        def overflowing():
+            full_since = state['full_since']
+            return full_since is not None and time.monotonic() - full_since >= OVERFLOW_GRACE
+
+        def produce():
+            try:
+                for chunk in chunks:
+                    with condition:
+                        while len(buffer) >= self.max_buffered_chunks and not state['stopped'] and not overflowing():
+                            full_since = state['full_since']
+                            condition.wait(None if full_since is None else
+                                           full_since + OVERFLOW_GRACE - time.monotonic())
+                        if state['stopped']:
+                            return
+                        if len(buffer) >= self.max_buffered_chunks:
+                            self.dropped_chunks += 1
+                            continue
+                        buffer.append(chunk)
+                        condition.notify_all()
+            except Exception as error:
+                state['error'] = error
+            finally:
+                with condition:
+                    state['finished'] = True
+                    condition.notify_all()
+
+        threading.Thread(target=produce, daemon=True).start()
+        try:
+            stdin.flush()
+            fd = stdin.fileno()
+            os.set_blocking(fd, False)
+            while True:
+                with condition:
+                    condition.wait_for(lambda: buffer or state['finished'])
+                    if not buffer:
+                        break
+                    view = memoryview(buffer.popleft())
+                    condition.notify_all()
+                while view:
+                    try:
+                        written = os.write(fd, view)
+                    except BlockingIOError:
+                        with condition:
+                            state['full_since'] = time.monotonic()
+                            condition.notify_all()
+                        _wait_ready(fd, selectors.EVENT_WRITE)
+                        with condition:
+                            state['full_since'] = None
+                        continue
+                    view = view[written:]
+                    self.bytes_in += written
+            if state['error'] is not None:
+                self._input_error = state['error']
+                self.zenity_process.terminate()
+        except BrokenPipeError:
+            # the user closed the dialogue before all of the input was written
+            pass
+        except Exception as error:
+            self._input_error = error
+            self.zenity_process.terminate()
+        finally:
+            with condition:
+                state['stopped'] = True
+                condition.notify_all()
+            try:
+                stdin.close()
+            except BrokenPipeError:
+                pass
+
+    async def _adrop_overflow(self, chunks):
+        """
+        The asyncio equivalent of _feed_dropping_overflow, consuming the chunks in a task instead of a thread - a chunk
+        is only dropped when the buffer is full while the transport has held data the pipe had no room for for
+        OVERFLOW_GRACE seconds
+        :param chunks: the encoded chunks of the asynchronous source
+        :return: an asynchronous generator of the chunks that fit in the buffer
+        """
+        buffer = asyncio.Queue(self.max_buffered_chunks)
+        end = object()
+        transport = self.zenity_process.stdin.transport
+
+        async def produce():
+            try:
+                full_since = None
+                async for chunk in chunks:
+                    # the transport only buffers data when the pipe is full, until then let the writer catch up
+                    while buffer.full():
+                        if not transport.get_write_buffer_size():
+                            full_since = None
+                            await asyncio.sleep(0)
+                            continue
+                        now = time.monotonic()
+                        full_since = full_since or now
+                        if now - full_since >= OVERFLOW_GRACE:
+                            break
+                        await asyncio.sleep(0.001)
+                    try:
+                        buffer.put_nowait(chunk)
+                    except asyncio.QueueFull:
+                        self.dropped_chunks += 1
+            except Exception as error:
+                await buffer.put(error)
+            else:
+                await buffer.put(end)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                chunk = await buffer.get()
+                if chunk is end:
+                    return
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            producer.cancel()
 
 
 class ColorSelection(BaseZenityDialogue):
+    uses_stdin = False
+
     def __init__(self, title=None, show_palette=False, window_icon=None, ok_label=None, cancel_label=None,
-                 width=None, height=None):
-        super().__init__(window_icon, ok_label, cancel_label, width, height)
+                 width=None, height=None, timeout=None):
+        super().__init__(window_icon, ok_label, cancel_label, width, height, timeout=timeout)
         self.arguments.append('--color-selection')
         if title is not None:
             self.arguments.append(f'--title={title}')
         if show_palette:
             self.arguments.append('--show-palette')
 
+    def get_result(self):
+        """
+        :return: the selected color as a tuple of red, green and blue values between 0 and 255, or None if the dialogue
+        was cancelled
+        """
+        view = self._result_view()
+        if view is None:
+            return None
+        color = str(view, 'ascii').strip()
+        if color.startswith('#'):
+            digits = len(color[1:]) // 3
+            return tuple(int(color[1 + i * digits:1 + (i + 1) * digits], 16) * 255 // (16 ** digits - 1)
+                         for i in range(3))
+        match = re.fullmatch(r'rgba?\((\d+),\s*(\d+),\s*(\d+)(?:,\s*[\d.]+)?\)', color)
+        if match is None:
+            raise ZenityError(f'unexpected color: {color}')
+        return tuple(int(component) for component in match.groups())
+
 
 class ScaleSelection(BaseZenityDialogue):
+    uses_stdin = False
+
     def __init__(self, title=None, text=None, initial_value=None, max_value=None, min_value=None, hide_value=False,
-                 window_icon=None, ok_label=None, cancel_label=None, width=None, height=None):
-        super().__init__(window_icon, ok_label, cancel_label, width, height)
+                 window_icon=None, ok_label=None, cancel_label=None, width=None, height=None, timeout=None):
+        super().__init__(window_icon, ok_label, cancel_label, width, height, timeout=timeout)
         self.arguments.append('--scale')
         if title is not None:
             self.arguments.append(f'--title={title}')
@@ -278,22 +1803,50 @@ class ScaleSelection(BaseZenityDialogue):
         if hide_value:
             self.arguments.append(f'--hide-value')
 
+    def get_result(self):
+        """
+        :return: the selected value as an int, or None if the dialogue was cancelled
+        """
+        view = self._result_view()
+        return None if view is None else int(view)
+
 
 class PasswordEntry(BaseZenityDialogue):
+    uses_stdin = False
+
     def __init__(self, title=None, username=False, ok_label=None, cancel_label=None,
-                 width=None, height=None):
-        super().__init__(None, ok_label, cancel_label, width, height)
+                 width=None, height=None, window_icon=None, timeout=None):
+        super().__init__(window_icon, ok_label, cancel_label, width, height, timeout=timeout)
         self.arguments.append('--password')
         if title is not None:
             self.arguments.append(f'--title={title}')
         if username:
             self.arguments.append('--username')
+        self.username = username
+
+    def get_result(self):
+        """
+        :return: the password, or a tuple of the username and the password if username was set. None if the dialogue
+        was cancelled
+        """
+        view = self._result_view()
+        if view is None:
+            return None
+        if self.username:
+            username, _, password = str(view, 'utf-8').partition('|')
+            return username, password
+        return str(view, 'utf-8')
 
 
 class ProgressBar(BaseZenityDialogue):
+    """
+    A class representing the zenity progress option
+    When max_refresh_rate is set, update_progress and update_message only record the latest values and a background
+    thread sends them to zenity at most max_refresh_rate times a second, so reporting from a hot loop stays cheap
+    """
     def __init__(self, text=None, title=None, percentage=0, auto_close=False, pulsate=False, window_icon=None,
-                 ok_label=None, cancel_label=None, width=None, height=None):
-        super().__init__(window_icon, ok_label, cancel_label, width, height)
+                 ok_label=None, cancel_label=None, width=None, height=None, max_refresh_rate=None, timeout=None):
+        super().__init__(window_icon, ok_label, cancel_label, width, height, timeout=timeout)
         self.arguments.append('--progress')
         self.arguments.append(f'--percentage={percentage}')
         if text is not None:
@@ -304,12 +1857,72 @@ class ProgressBar(BaseZenityDialogue):
             self.arguments.append('--auto-close')
         if pulsate:
             self.arguments.append('--pulsate')
+        self.max_refresh_rate = max_refresh_rate
+
+    def _reset_state(self):
+        super()._reset_state()
+        self._pending_percentage = None
+        self._pending_message = None
+        self._sent_percentage = None
+        self._sent_message = None
+        self._flush_lock = threading.Lock()
+        self._refresh_stopped = threading.Event()
+        self._refresh_thread: Union[threading.Thread, None] = None
+        # set when the user closed the dialogue while updates were still being sent
+        self.cancelled = False
+
+    def start(self):
+        super().start()
+        if self.max_refresh_rate is not None:
+            self._refresh_stopped.clear()
+            self._refresh_thread = threading.Thread(target=self._refresh_loop, daemon=True)
+            self._refresh_thread.start()
+
+    def wait(self, timeout=None):
+        try:
+            return super().wait(timeout)
+        finally:
+            self._stop_refreshing()
+
+    def stop(self):
+        """
+        Send any pending update and stop the zenity process
+        :return: the return code of the process
+        """
+        self._stop_refreshing()
+        try:
+            self.flush_updates()
+        except (BrokenPipeError, ValueError):
+            # the dialogue was closed, or its input was already finished
+            pass
+        return super().stop()
+
+    def finish(self):
+        """
+        Send any pending update and close the standard input of zenity, telling it that no more updates will follow -
+        with auto_close the dialogue then closes itself. Raises BrokenPipeError if the user closed the dialogue
+        """
+        self._stop_refreshing()
+        stdin = self.zenity_process.stdin
+        if stdin.closed:
+            return
+        try:
+            self.flush_updates()
+        finally:
+            try:
+                stdin.close()
+            except BrokenPipeError:
+                # unflushed input to a dead process
+                pass
 
     def update_progress(self, percentage):
         """
         This function will update the position of the progress bar
         :param percentage: the new percentage to move the progress bar to
         """
+        if self.max_refresh_rate is not None:
+            self._pending_percentage = percentage
+            return
         self.send_input(f'{str(percentage)}\n')
 
     def update_message(self, message):
@@ -317,4 +1930,1541 @@ class ProgressBar(BaseZenityDialogue):
         THis will update the message displayed above the progress bar
         :param message: the new message to display
         """
+        if self.max_refresh_rate is not None:
+            self._pending_message = message
+            return
         self.send_input(f'# {message}\n')
+
+    def flush_updates(self):
+        """
+        Immediately send the latest percentage and message recorded in coalescing mode, if they changed
+        """
+        with self._flush_lock:
+            percentage, message = self._pending_percentage, self._pending_message
+            lines = ''
+            if message is not None and message != self._sent_message:
+                lines += f'# {message}\n'
+            if percentage is not None and percentage != self._sent_percentage:
+                lines += f'{str(percentage)}\n'
+            if lines:
+                self.send_input(lines)
+                self._sent_percentage, self._sent_message = percentage, message
+
+    def track(self, iterable, total=None):
+        """
+        A generator that starts the progress bar and yields the items of the iterable, reporting the percentage,
+        throughput and estimated time remaining at most max_refresh_rate (or TRACK_REFRESH_RATE) times a second.
+        When the total is unknown the bar pulsates. The bar is stopped if the iteration raises or is abandoned. If the
+        user cancels the dialogue the iteration stops, cancelled is set and ZenityError is raised
+        :param iterable: the items to iterate over
+        :param total: the number of items, taken from len(iterable) if not given
+        """
+        if total is None:
+            try:
+                total = len(iterable)
+            except TypeError:
+                pass
+        if not total and '--pulsate' not in self.arguments:
+            self.arguments.append('--pulsate')
+        interval = 1 / (self.max_refresh_rate or TRACK_REFRESH_RATE)
+        self.start()
+        finished = False
+        count = 0
+        try:
+            started = time.monotonic()
+            next_refresh = started + interval
+            for item in iterable:
+                yield item
+                count += 1
+                if self.cancelled:
+                    break
+                now = time.monotonic()
+                if now >= next_refresh:
+                    next_refresh = now + interval
+                    self._report_tracked(count, total, now - started)
+            if not self.cancelled:
+                if total:
+                    self.update_progress(100)
+                self._report_tracked(count, total, time.monotonic() - started)
+                self.finish()
+                finished = True
+        except BrokenPipeError:
+            # the user cancelled the dialogue
+            self.cancelled = True
+        finally:
+            if not finished:
+                self.stop()
+        if self.cancelled:
+            raise ZenityError(f'the progress dialogue was cancelled by the user after {count} items')
+        if '--auto-close' in self.arguments:
+            self.wait()
+
+    def _report_tracked(self, count, total, elapsed):
+        rate = count / elapsed if elapsed > 0 else 0.0
+        if total:
+            if count < total:
+                self.update_progress(count * 100 // total)
+            remaining = datetime.timedelta(seconds=round((total - count) / rate)) if rate else '?'
+            self.update_message(f'{count}/{total} - {rate:.1f} items/s - {remaining} remaining')
+        else:
+            self.update_message(f'{count} - {rate:.1f} items/s')
+
+    def _refresh_loop(self):
+        interval = 1 / self.max_refresh_rate
+        while not self._refresh_stopped.wait(interval):
+            if self.zenity_process.poll() is not None:
+                # zenity exits with 0 only when the bar completes
+                self.cancelled = self.zenity_process.returncode != 0
+                return
+            try:
+                self.flush_updates()
+            except BrokenPipeError:
+                # the user closed the progress dialogue
+                self.cancelled = True
+                return
+            except ValueError:
+                # the standard input was closed without finish, nothing more can be sent
+                return
+
+    def _stop_refreshing(self):
+        self._refresh_stopped.set()
+        if self._refresh_thread is not None and self._refresh_thread is not threading.current_thread():
+            self._refresh_thread.join()
+            self._refresh_thread = None
+
+    async def aupdate_progress(self, percentage):
+        """
+        The asyncio equivalent of update_progress
+        :param percentage: the new percentage to move the progress bar to
+        """
+        await self.asend_input(f'{str(percentage)}\n')
+
+    async def aupdate_message(self, message):
+        """
+        The asyncio equivalent of update_message
+        :param message: the new message to display
+        """
+        await self.asend_input(f'# {message}\n')
+
+
+def progress(iterable, total=None, **kwargs):
+    """
+    Iterate over an iterable while showing its progress in a zenity progress bar, see ProgressBar.track
+    :param iterable: the items to iterate over
+    :param total: the number of items, taken from len(iterable) if not given
+    :param kwargs: arguments for the ProgressBar, the bar closes itself when done unless auto_close=False is given
+    :return: a generator yielding the items of the iterable
+    """
+    kwargs.setdefault('auto_close', True)
+    return ProgressBar(**kwargs).track(iterable, total)
+
+
+def _format_size(size):
+    """
+    :return: a human readable size in bytes, e.g. '1.5 MiB'
+    """
+    for unit in ('B', 'KiB', 'MiB', 'GiB', 'TiB'):
+        if size < 1024 or unit == 'TiB':
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+
+
+class ProgressFile:
+    """
+    A binary file wrapper that shows the bytes read from or written to it in a zenity progress bar, with throughput
+    and estimated time remaining - e.g. around the standard output of a tar process, or a file passed to a library
+    that reads it. The bar is refreshed at most max_refresh_rate (or TRACK_REFRESH_RATE) times a second, and
+    ZenityError is raised by the next read or write if the user cancels the dialogue
+    """
+    def __init__(self, file, total=None, bar=None, **kwargs):
+        """
+        :param file: a binary file object
+        :param total: the number of bytes that will be transferred, taken from the size of the file if it is a
+        regular file. When unknown the bar pulsates
+        :param bar: an unstarted ProgressBar, created from kwargs (closing itself when done unless auto_close=False
+        is given) if not given
+        """
+        self.file = file
+        if total is None:
+            try:
+                file_stat = os.fstat(file.fileno())
+                if stat.S_ISREG(file_stat.st_mode):
+                    total = max(file_stat.st_size - file.tell(), 0) if file.seekable() else file_stat.st_size
+            except (AttributeError, OSError, ValueError):
+                pass
+        self.total = total
+        self.bytes_transferred = 0
+        if bar is None:
+            kwargs.setdefault('auto_close', True)
+            bar = ProgressBar(**kwargs)
+        self.bar = bar
+        if not total and '--pulsate' not in bar.arguments:
+            bar.arguments.append('--pulsate')
+        self._interval = 1 / (bar.max_refresh_rate or TRACK_REFRESH_RATE)
+        self._started = time.monotonic()
+        self._next_refresh = self._started + self._interval
+        self._closed = False
+        bar.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(exc_type is None)
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.advance(len(data))
+        return data
+
+    def read1(self, size=-1):
+        data = self.file.read1(size)
+        self.advance(len(data))
+        return data
+
+    def readinto(self, buffer):
+        count = self.file.readinto(buffer)
+        self.advance(count or 0)
+        return count
+
+    def write(self, data):
+        count = self.file.write(data)
+        self.advance(len(memoryview(data).cast('B')) if count is None else count)
+        return count
+
+    def advance(self, count):
+        """
+        Count bytes transferred without going through the wrapper, refreshing the bar if it is due
+        :param count: the number of bytes
+        """
+        self.bytes_transferred += count
+        if self.bar.cancelled:
+            # noticed by the refresh thread of a coalescing bar
+            raise ZenityError('the transfer was cancelled by the user')
+        now = time.monotonic()
+        if now >= self._next_refresh:
+            self._next_refresh = now + self._interval
+            self._report(now)
+
+    def _report(self, now):
+        done = self.bytes_transferred
+        elapsed = now - self._started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        try:
+            if self.total:
+                if done < self.total:
+                    self.bar.update_progress(done * 100 // self.total)
+                remaining = datetime.timedelta(seconds=round((self.total - done) / rate)) if rate else '?'
+                self.bar.update_message(f'{_format_size(done)} of {_format_size(self.total)} - '
+                                        f'{_format_size(rate)}/s - {remaining} remaining')
+            else:
+                self.bar.update_message(f'{_format_size(done)} - {_format_size(rate)}/s')
+        except (BrokenPipeError, ValueError):
+            self.bar.cancelled = True
+            raise ZenityError('the transfer was cancelled by the user')
+
+    def close(self, completed=True):
+        """
+        Close the progress bar, without closing the wrapped file
+        :param completed: whether the transfer completed, otherwise the bar is stopped
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if not completed or self.bar.cancelled:
+            self.bar.stop()
+            return
+        try:
+            if self.total:
+                self.bar.update_progress(100)
+            self._report(time.monotonic())
+            self.bar.finish()
+        except (BrokenPipeError, ZenityError):
+            return
+        if '--auto-close' in self.bar.arguments:
+            self.bar.wait()
+
+
+def _file_descriptor(file, writable=False):
+    """
+    :return: the file descriptor of a file that can be used directly without skipping buffered data, or None
+    """
+    if isinstance(file, int):
+        return file
+    if isinstance(file, io.FileIO) or writable and isinstance(file, io.BufferedWriter):
+        file.flush()
+        return file.fileno()
+    return None
+
+
+def copy_with_progress(source, destination, total=None, bar=None, chunk_size=COPY_CHUNK_SIZE, **kwargs):
+    """
+    Copy a file or stream while showing its progress in a zenity progress bar. Between a regular file and another
+    file descriptor the data is copied by the kernel with os.sendfile, otherwise it is read into a single
+    preallocated buffer and written from it without intermediate copies
+    :param source: a path, a file descriptor or a binary file object to read
+    :param destination: a path, a file descriptor or a binary file object to write
+    :param total: the number of bytes to copy, taken from the size of the source if it is a regular file
+    :param bar: an unstarted ProgressBar, see ProgressFile
+    :param chunk_size: the number of bytes copied at a time
+    :param kwargs: arguments for the ProgressBar
+    :return: the number of bytes copied
+    """
+    with contextlib.ExitStack() as stack:
+        if isinstance(source, (str, os.PathLike)):
+            source = stack.enter_context(open(source, 'rb', buffering=0))
+        if isinstance(destination, (str, os.PathLike)):
+            destination = stack.enter_context(open(destination, 'wb', buffering=0))
+        source_file = open(source, 'rb', buffering=0, closefd=False) if isinstance(source, int) else source
+        tracked = stack.enter_context(ProgressFile(source_file, total, bar, **kwargs))
+        source_fd = _file_descriptor(source)
+        destination_fd = _file_descriptor(destination, writable=True)
+        if source_fd is not None and destination_fd is not None and hasattr(os, 'sendfile') and \
+                stat.S_ISREG(os.fstat(source_fd).st_mode):
+            if _sendfile(source_fd, destination_fd, tracked, chunk_size):
+                return tracked.bytes_transferred
+        if hasattr(destination, 'flush'):
+            destination.flush()
+        buffer = bytearray(chunk_size)
+        with memoryview(buffer) as view:
+            while True:
+                count = tracked.readinto(view)
+                if not count:
+                    break
+                if isinstance(destination, int):
+                    _write_all(destination, view[:count])
+                else:
+                    destination.write(view[:count])
+        return tracked.bytes_transferred
+
+
+def _sendfile(source_fd, destination_fd, tracked, chunk_size):
+    """
+    Copy with os.sendfile until the end of the source
+    :return: False if sendfile does not support the destination, before anything was copied
+    """
+    while True:
+        try:
+            sent = os.sendfile(destination_fd, source_fd, None, chunk_size)
+        except OSError as error:
+            if tracked.bytes_transferred == 0 and error.errno in (errno.EINVAL, errno.ENOSYS, errno.ENOTSOCK,
+                                                                   errno.EOPNOTSUPP):
+                return False
+            raise
+        if sent == 0:
+            return True
+        tracked.advance(sent)
+
+
+def _write_all(fd, view):
+    while view:
+        view = view[os.write(fd, view):]
+
+
+class ProgressReporter:
+    """
+    The handle a single worker uses to report into a ProgressAggregator. Each reporter owns one slot of the
+    aggregator's counters, so it never needs a lock - but a slot must only be used by one worker at a time.
+    Reporters of a process-shared aggregator can be pickled and sent to process pool workers
+    """
+    def __init__(self, slot, slots, message_size, buffer=None, shared_memory_name=None):
+        self.slot = slot
+        self._slots = slots
+        self._message_size = message_size
+        self._buffer = buffer
+        self._shared_memory = None
+        self._shared_memory_name = shared_memory_name
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self._shared_memory_name is not None:
+            state['_buffer'] = state['_shared_memory'] = None
+        return state
+
+    def _get_buffer(self):
+        if self._buffer is None:
+            self._shared_memory = shared_memory.SharedMemory(name=self._shared_memory_name)
+            self._buffer = self._shared_memory.buf
+        return self._buffer
+
+    def advance(self, amount=1):
+        """
+        Add to the number of completed units of this worker
+        :param amount: the number of units that were completed
+        """
+        buffer = self._get_buffer()
+        offset = self.slot * 8
+        struct.pack_into('q', buffer, offset, struct.unpack_from('q', buffer, offset)[0] + amount)
+
+    def set_message(self, message):
+        """
+        Set the sub-task text of this worker, the most recently set text is displayed by the progress bar
+        :param message: the text to display
+        """
+        buffer = self._get_buffer()
+        encoded = message.encode('utf-8')[:self._message_size]
+        offset = self._slots * 16 + self.slot * self._message_size
+        buffer[offset:offset + self._message_size] = encoded.ljust(self._message_size, b'\0')
+        struct.pack_into('q', buffer, (self._slots + self.slot) * 8, time.monotonic_ns())
+
+
+class ProgressAggregator:
+    """
+    Aggregates the progress of many thread pool or process pool workers into a single ProgressBar.
+    Every worker reports through its own ProgressReporter slot, and a single owner thread samples all of the slots
+    and drives the zenity process. With processes=True the counters live in shared memory.
+    Use as a context manager, or call start and close
+    """
+    def __init__(self, total, slots, bar=None, processes=False, refresh_rate=TRACK_REFRESH_RATE, message_size=128):
+        """
+        :param total: the total number of units of work
+        :param slots: the number of reporters, usually the number of workers
+        :param bar: the ProgressBar to drive, a new auto closing one by default
+        :param processes: whether the reporters will be used from other processes
+        :param refresh_rate: how many times a second the counters are sampled
+        :param message_size: the maximum size in bytes of a worker's sub-task text
+        """
+        self.total = total
+        self.slots = slots
+        self.bar = bar if bar is not None else ProgressBar(auto_close=True)
+        self.refresh_rate = refresh_rate
+        self.message_size = message_size
+        size = slots * (16 + message_size)
+        if processes:
+            self._shared_memory = shared_memory.SharedMemory(create=True, size=size)
+            self._buffer = self._shared_memory.buf
+            self._buffer[:size] = bytes(size)
+        else:
+            self._shared_memory = None
+            self._buffer = bytearray(size)
+        self._sent_stamp = 0
+        self._stopped = threading.Event()
+        self._sampler: Union[threading.Thread, None] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def reporter(self, slot):
+        """
+        :param slot: the slot of the worker, between 0 and slots - 1
+        :return: a ProgressReporter for the slot
+        """
+        if not 0 <= slot < self.slots:
+            raise ZenityError(f'slot {slot} is out of range, the aggregator has {self.slots} slots')
+        if self._shared_memory is not None:
+            return ProgressReporter(slot, self.slots, self.message_size, shared_memory_name=self._shared_memory.name)
+        return ProgressReporter(slot, self.slots, self.message_size, buffer=self._buffer)
+
+    def completed(self):
+        """
+        :return: the number of units completed by all of the workers
+        """
+        return sum(struct.unpack_from(f'{self.slots}q', self._buffer, 0))
+
+    def start(self):
+        """
+        Start the progress bar and the thread sampling the workers' counters
+        """
+        self.bar.start()
+        self._stopped.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+        self._sampler.start()
+
+    def close(self):
+        """
+        Stop sampling, show the final progress and release the shared memory
+        """
+        self._stopped.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+        try:
+            self._sample()
+            self.bar.finish()
+        except BrokenPipeError:
+            pass
+        if self._shared_memory is not None:
+            self._buffer = None
+            self._shared_memory.close()
+            self._shared_memory.unlink()
+            self._shared_memory = None
+
+    def _sample(self):
+        if self.total:
+            self.bar.update_progress(min(self.completed() * 100 // self.total, 100))
+        stamps = struct.unpack_from(f'{self.slots}q', self._buffer, self.slots * 8)
+        newest = max(range(self.slots), key=stamps.__getitem__)
+        if stamps[newest] > self._sent_stamp:
+            self._sent_stamp = stamps[newest]
+            offset = self.slots * 16 + newest * self.message_size
+            message = bytes(self._buffer[offset:offset + self.message_size]).rstrip(b'\0')
+            self.bar.update_message(message.decode('utf-8', errors='ignore'))
+
+    def _sample_loop(self):
+        interval = 1 / self.refresh_rate
+        while not self._stopped.wait(interval):
+            try:
+                self._sample()
+            except BrokenPipeError:
+                # the user closed the progress dialogue
+                return
+
+
+class DialogueScheduler:
+    """
+    Runs dialogues on a bounded pool of threads instead of letting every caller pop up its own window.
+    Identical dialogues (with the same arguments) that are already in flight share a single run and result, and a
+    burst of error messages submitted with submit_error is batched into a single List summary dialogue
+    """
+    def __init__(self, max_concurrent=2, error_batch_window=0.5):
+        """
+        :param max_concurrent: the maximum number of dialogues displayed at the same time
+        :param error_batch_window: how many seconds to collect errors for before displaying them
+        """
+        self.error_batch_window = error_batch_window
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix='zenity-dialogue')
+        self._in_flight = {}
+        self._pending_errors = []
+        self._error_timer: Union[threading.Timer, None] = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def submit(self, dialogue):
+        """
+        Schedule a dialogue to be run
+        :param dialogue: the dialogue to run
+        :return: a Future of the (exit code, output) of the dialogue, shared with identical in flight dialogues
+        """
+        key = tuple(dialogue.arguments)
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is None:
+                future = self._executor.submit(self._run, dialogue)
+                self._in_flight[key] = future
+                future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def submit_error(self, text, title=None):
+        """
+        Schedule an error message. Errors submitted within error_batch_window seconds of each other are displayed
+        together, a single error is displayed as a regular ErrorMessage
+        :param text: the error message
+        :param title: the title of the error
+        :return: a Future of the (exit code, output) of the dialogue that displayed the error
+        """
+        future = Future()
+        with self._lock:
+            self._pending_errors.append((title, text, future))
+            if self._error_timer is None:
+                self._error_timer = threading.Timer(self.error_batch_window, self.flush_errors)
+                self._error_timer.daemon = True
+                self._error_timer.start()
+        return future
+
+    def flush_errors(self):
+        """
+        Immediately display the errors collected so far
+        """
+        with self._lock:
+            pending, self._pending_errors = self._pending_errors, []
+            if self._error_timer is not None:
+                self._error_timer.cancel()
+                self._error_timer = None
+        if not pending:
+            return
+        errors = list(dict.fromkeys((title, text) for title, text, _ in pending))
+        if len(errors) == 1:
+            title, text = errors[0]
+            dialogue = ErrorMessage(text=text, title=title)
+        else:
+            dialogue = List(('Title', 'Error'), rows=[('' if title is None else title, text) for title, text in errors],
+                            title=f'{len(errors)} errors', text=f'{len(errors)} errors occurred')
+        batch = self.submit(dialogue)
+        for _, _, future in pending:
+            batch.add_done_callback(lambda done, future=future: _copy_future_result(done, future))
+
+    def shutdown(self, wait=True):
+        """
+        Display any pending errors and stop accepting dialogues
+        :param wait: whether to wait for the scheduled dialogues to complete
+        """
+        self.flush_errors()
+        self._executor.shutdown(wait=wait)
+
+    @staticmethod
+    def _run(dialogue):
+        exit_code = dialogue.run()
+        return exit_code, dialogue.output
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+
+def _copy_future_result(source, target):
+    """
+    Complete a future with the outcome of another, completed, future
+    :param source: the completed future
+    :param target: the future to complete
+    """
+    error = source.exception()
+    if error is not None:
+        target.set_exception(error)
+    else:
+        target.set_result(source.result())
+
+
+class HistogramCollector:
+    """
+    An observer (see add_observer) that keeps in-memory histograms of how long dialogues take to spawn and how long
+    users take to answer them, and counts dialogues that failed with a ZenityError
+    """
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        :param buckets: the upper bounds of the histogram buckets, in seconds
+        """
+        self.buckets = tuple(buckets)
+        self.spawn_times = [0] * (len(self.buckets) + 1)
+        self.answer_times = [0] * (len(self.buckets) + 1)
+        self.exits = 0
+        self.failures = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        with self._lock:
+            if event.kind == 'start':
+                self._started[id(event.dialogue)] = event.timestamp
+            elif event.kind == 'spawned':
+                started = self._started.pop(id(event.dialogue), None)
+                if started is not None:
+                    self.spawn_times[bisect.bisect_left(self.buckets, event.timestamp - started)] += 1
+                self._started[id(event.dialogue)] = event.timestamp
+            elif event.kind in ('exit', 'stop'):
+                spawned = self._started.pop(id(event.dialogue), None)
+                if spawned is not None:
+                    self.answer_times[bisect.bisect_left(self.buckets, event.timestamp - spawned)] += 1
+                self.exits += 1
+                if event.kind == 'exit' and event.exit_code not in ANSWER_EXIT_CODES:
+                    self.failures += 1
+                self.bytes_in += event.bytes_in
+                self.bytes_out += event.bytes_out
+
+    def summary(self):
+        """
+        :return: a dict of the collected statistics, histograms map a bucket's upper bound (or 'inf') to its count
+        """
+        labels = [str(bucket) for bucket in self.buckets] + ['inf']
+        with self._lock:
+            return {'spawn_times': dict(zip(labels, self.spawn_times)),
+                    'answer_times': dict(zip(labels, self.answer_times)),
+                    'exits': self.exits,
+                    'failures': self.failures,
+                    'bytes_in': self.bytes_in,
+                    'bytes_out': self.bytes_out}
+
+
+class WarmDialoguePool:
+    """
+    Keeps a number of resident GTK helper processes (see zenity_helper.py) warm, so that question, message and entry
+    dialogues appear at once instead of paying zenity's GTK startup every time. Dialogues the helpers don't support,
+    or every dialogue when the pool is disabled or the helpers can't start (PyGObject or a display is missing), are run
+    with zenity as usual
+    """
+    def __init__(self, size=1, enabled=None):
+        """
+        :param size: the number of warm helper processes to keep
+        :param enabled: whether to run dialogues on the helpers, by default only when the backend is the real zenity -
+        a custom backend (e.g. FAKE_ZENITY) is always used for every dialogue
+        """
+        self.size = size
+        self.available = _backend == ['zenity'] if enabled is None else enabled
+        self._idle = []
+        self._starting = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self._replenish()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def run(self, dialogue, timeout=None):
+        """
+        Run a dialogue on a warm helper if one is idle, or with zenity otherwise, and wait for it to complete
+        :param dialogue: the dialogue to run
+        :param timeout: the maximum number of seconds to wait, after which the dialogue is closed and ZenityTimeout
+        is raised. None to wait forever
+        :return: the exit code of the dialogue
+        """
+        with self._lock:
+            helper = self._idle.pop() if self._idle else None
+        if helper is None:
+            self._replenish()
+            return dialogue.run(timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            if _observers:
+                dialogue._emit('start')
+                dialogue._emit('spawned')
+            helper.stdin.write((json.dumps({'arguments': dialogue.arguments[1:]}) + '\n').encode())
+            helper.stdin.flush()
+            if timeout is not None and not _wait_ready(helper.stdout, selectors.EVENT_READ, timeout):
+                # the helper is still displaying the dialogue, closing it is the only way to take it down
+                self._discard(helper)
+                self._replenish()
+                dialogue._report_exit(None, 'stop')
+                raise ZenityTimeout(f'the dialogue did not complete within {timeout} seconds')
+            response = json.loads(helper.stdout.readline())
+        except (BrokenPipeError, ValueError):
+            # the helper died, it is not returned to the pool
+            self._discard(helper)
+            self._replenish()
+            return dialogue.run(None if deadline is None else max(deadline - time.monotonic(), 0))
+        self._release(helper)
+        if response.get('unsupported'):
+            return dialogue.run(None if deadline is None else max(deadline - time.monotonic(), 0))
+        dialogue._stdout_data += response['output'].encode()
+        return dialogue._finish(response['exit_code'])
+
+    def close(self):
+        """
+        Stop all of the idle helpers
+        """
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for helper in idle:
+            self._discard(helper)
+
+    def _replenish(self):
+        with self._lock:
+            missing = self.size - len(self._idle) - self._starting if self.available and not self._closed else 0
+            self._starting += max(missing, 0)
+        for _ in range(missing):
+            threading.Thread(target=self._start_helper, daemon=True).start()
+
+    def _start_helper(self):
+        helper = None
+        try:
+            helper = subprocess.Popen([sys.executable, GTK_HELPER], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                      stderr=subprocess.DEVNULL)
+            ready = json.loads(helper.stdout.readline() or '{}').get('ready', False)
+        except (OSError, ValueError):
+            ready = False
+        with self._lock:
+            self._starting -= 1
+            if not ready:
+                # don't keep trying to start helpers that can't work on this machine
+                self.available = False
+        if ready:
+            self._release(helper)
+        elif helper is not None:
+            self._discard(helper)
+
+    def _release(self, helper):
+        with self._lock:
+            if not self._closed:
+                self._idle.append(helper)
+                return
+        self._discard(helper)
+
+    @staticmethod
+    def _discard(helper):
+        for pipe in (helper.stdin, helper.stdout):
+            try:
+                pipe.close()
+            except BrokenPipeError:
+                pass
+        helper.kill()
+        helper.wait()
+
+
+def _is_plain_value(value):
+    """
+    :param value: a keyword argument of a dialogue
+    :return: whether the value is a string, a number, a boolean, None or a tuple of those - safe to memoize by value
+    """
+    if isinstance(value, tuple):
+        return all(_is_plain_value(item) for item in value)
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+def _is_one_shot(value):
+    """
+    :param value: a keyword argument of a dialogue
+    :return: whether the value is consumed by the first dialogue reading it - an iterator, a file or an asynchronous
+    iterable - so it can't be shared by the dialogues created from a spec
+    """
+    if hasattr(value, 'read') or hasattr(value, '__aiter__'):
+        return True
+    try:
+        return iter(value) is value
+    except TypeError:
+        return False
+
+
+class DialogueSpec:
+    """
+    An immutable description of a dialogue - its class and keyword arguments - whose argument vector is built once.
+    New dialogues are created from the spec by copying a prototype instead of rebuilding the arguments, and specs
+    derived with plain value overrides (e.g. a different text) are memoized as well.
+    Per-run data such as streamed rows or a text source should be given as overrides to create, which never memoizes it.
+    A spec refuses options that can only be read once, and a spec whose options are not all plain values builds every
+    dialogue from scratch instead of cloning the prototype
+    """
+    __slots__ = ('dialogue_class', 'options', 'arguments', '_prototype', '_derived', '_clonable')
+    # the maximum number of derived specs memoized by each spec
+    MAX_DERIVED = 128
+
+    def __init__(self, dialogue_class, **options):
+        """
+        :param dialogue_class: the dialogue class, e.g. WarningMessage
+        :param options: the keyword arguments of the dialogue class
+        """
+        for name, value in options.items():
+            if _is_one_shot(value):
+                raise ZenityError(f'{name} can only be read once, give it as an override to create instead')
+        prototype = dialogue_class(**options)
+        object.__setattr__(self, 'dialogue_class', dialogue_class)
+        object.__setattr__(self, 'options', types.MappingProxyType(dict(options)))
+        object.__setattr__(self, 'arguments', tuple(prototype.arguments))
+        object.__setattr__(self, '_prototype', prototype)
+        object.__setattr__(self, '_derived', {})
+        # a prototype holding per-run data such as an iterator would share it with every clone
+        object.__setattr__(self, '_clonable', all(_is_plain_value(value) for value in options.values()))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __eq__(self, other):
+        if not isinstance(other, DialogueSpec):
+            return NotImplemented
+        return self.dialogue_class is other.dialogue_class and self.arguments == other.arguments
+
+    def __hash__(self):
+        return hash((self.dialogue_class, self.arguments))
+
+    def __repr__(self):
+        options = ', '.join(f'{name}={value!r}' for name, value in self.options.items())
+        return f'{type(self).__name__}({self.dialogue_class.__name__}, {options})'
+
+    def replace(self, **overrides):
+        """
+        :param overrides: keyword arguments to change
+        :return: a spec with the overrides applied, memoized when the overrides are plain values
+        """
+        if not overrides:
+            return self
+        if not all(_is_plain_value(value) for value in overrides.values()):
+            return DialogueSpec(self.dialogue_class, **{**self.options, **overrides})
+        key = tuple(sorted(overrides.items()))
+        derived = self._derived.get(key)
+        if derived is None:
+            derived = DialogueSpec(self.dialogue_class, **{**self.options, **overrides})
+            if len(self._derived) >= self.MAX_DERIVED:
+                del self._derived[next(iter(self._derived))]
+            self._derived[key] = derived
+        return derived
+
+    def create(self, **overrides):
+        """
+        :param overrides: keyword arguments to change for this dialogue only
+        :return: a new, unstarted, dialogue
+        """
+        if not self._clonable or not all(_is_plain_value(value) for value in overrides.values()):
+            # per-run data such as an iterator or a file must neither be kept alive nor shared by a memoized spec
+            return self.dialogue_class(**{**self.options, **overrides})
+        return self.replace(**overrides)._prototype._clone()
+
+    def run(self, **overrides):
+        """
+        Create a dialogue from the spec and run it
+        :param overrides: keyword arguments to change for this dialogue only
+        :return: the dialogue, after it has completed
+        """
+        dialogue = self.create(**overrides)
+        dialogue.run()
+        return dialogue
+
+
+class DialogueGroup:
+    """
+    Runs many dialogues concurrently from a single thread, without a thread per process and without an event loop.
+    The output pipes of every dialogue in the group are waited on together with selectors, from the thread that
+    calls poll or as_completed - so a group must only be used from one thread
+    """
+    def __init__(self, dialogues=()):
+        """
+        :param dialogues: unstarted dialogues to start in the group
+        """
+        self._multiplexer = _PipeMultiplexer()
+        # an abandoned group still releases its selector and wakeup pipe when it is garbage collected
+        self._close_multiplexer = weakref.finalize(self, self._multiplexer.close)
+        self._running = []
+        for dialogue in dialogues:
+            self.add(dialogue)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self._running)
+
+    def add(self, dialogue):
+        """
+        Start a dialogue in the group
+        :param dialogue: an unstarted dialogue
+        """
+        if dialogue.zenity_process is not None:
+            raise ZenityError('only unstarted dialogues can be added to a group')
+        dialogue._multiplexer = self._multiplexer
+        dialogue.start()
+        self._running.append(dialogue)
+
+    def poll(self, timeout=0):
+        """
+        Read the output of every dialogue that is ready and collect the dialogues that completed
+        :param timeout: the maximum number of seconds to wait for output, None to wait until there is some
+        :return: a list of the dialogues that completed, their exit code and output can be read with wait, get_output
+        and get_result without blocking
+        """
+        if self._running:
+            self._multiplexer.poll(timeout)
+        completed = [dialogue for dialogue in self._running if not dialogue._open_pipes]
+        if completed:
+            self._running = [dialogue for dialogue in self._running if dialogue._open_pipes]
+            for dialogue in completed:
+                dialogue.zenity_process.wait()
+        return completed
+
+    def as_completed(self, timeout=None):
+        """
+        A generator yielding the dialogues of the group as they complete
+        :param timeout: the maximum number of seconds to wait for all of the dialogues, after which ZenityTimeout is
+        raised. None to wait forever
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._running:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise ZenityTimeout(f'{len(self._running)} dialogues did not complete within {timeout} seconds')
+            yield from self.poll(remaining)
+
+    def wait_all(self, timeout=None):
+        """
+        Wait for every dialogue in the group to complete
+        :param timeout: the maximum number of seconds to wait, see as_completed
+        :return: a list of the completed dialogues, in order of completion
+        """
+        return list(self.as_completed(timeout))
+
+    def stop_all(self):
+        """
+        Stop every dialogue in the group that is still running
+        """
+        running, self._running = self._running, []
+        for dialogue in running:
+            dialogue.stop()
+
+    def close(self):
+        """
+        Stop every dialogue that is still running and release the selector and pipes of the group. A closed group
+        can't be used anymore
+        """
+        self.stop_all()
+        self._close_multiplexer()
+
+
+def _freeze(value):
+    """
+    :return: the value with every list replaced by a tuple, to use JSON data as a dictionary key
+    """
+    return tuple(_freeze(item) for item in value) if isinstance(value, list) else value
+
+
+class AnswerCache:
+    """
+    Remembers the answers of dialogues, so that a prompt repeated for every item of a batch (e.g. "overwrite?" for
+    each file) only reaches the user once. An answer is keyed by the class and argument vector of its dialogue, or by
+    an explicit key - which must be given when the dialogue reads streamed input, since that is not part of the
+    arguments. Answers expire after ttl seconds and the least recently used answers are evicted beyond max_entries.
+    With a path, the answers are loaded from and saved to a JSON file readable only by its owner, so they outlive the
+    process. Secrets - the answers of password entries, hidden text entries and forms with password fields - are never
+    remembered, those dialogues always run.
+    The cache is safe to share between threads
+    """
+    def __init__(self, ttl=None, max_entries=1024, path=None, remember_cancel=False):
+        """
+        :param ttl: the number of seconds an answer is remembered, None to remember answers until they are evicted
+        :param max_entries: the maximum number of answers remembered
+        :param path: the path of a JSON file persisting the answers, see save
+        :param remember_cancel: whether to remember dialogues closed with cancel (exit code 1 - including 'no' to a
+        question and extra buttons) as well as accepted ones
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self.remember_cancel = remember_cancel
+        self.hits = 0
+        self.misses = 0
+        # key -> (expiry time or None, exit code, output), in least recently used order
+        self._answers = collections.OrderedDict()
+        self._lock = threading.Lock()
+        if path is not None:
+            self._load()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self._answers)
+
+    def run(self, dialogue, key=None, apply_to_all=False, yes_to_all_label='Yes to all', no_to_all_label='No to all'):
+        """
+        Answer a dialogue from the cache, or run it and remember its answer. A cached answer is restored into the
+        dialogue, so get_output and get_result work as if it had run
+        :param dialogue: an unstarted dialogue
+        :param key: the key of the answer, the class and arguments of the dialogue by default - required when the
+        dialogue reads streamed input
+        :param apply_to_all: for questions - add 'yes to all' and 'no to all' buttons instead of remembering every
+        answer, only an answer given with one of them is remembered (as a plain yes or no). Give the same key to the
+        questions it should apply to, e.g. key='overwrite' for 'Overwrite {name}?'
+        :return: the exit code of the dialogue
+        """
+        if self._is_secret(dialogue):
+            return dialogue.run()
+        if key is None:
+            if dialogue._input_stream() is not None:
+                raise ZenityError('the answer of a dialogue reading streamed input must be cached with an explicit key')
+            key = (type(dialogue).__name__,) + tuple(dialogue.arguments[1:])
+        answer = self.get(key)
+        if answer is not None:
+            self._restore(dialogue, *answer)
+            return dialogue.exit_code
+        if not apply_to_all:
+            exit_code = dialogue.run()
+            if exit_code == 0 or exit_code == 1 and self.remember_cancel:
+                self.put(key, exit_code, dialogue._stdout_data)
+            return exit_code
+        if not isinstance(dialogue, QuestionMessage):
+            raise ZenityError('apply to all is only supported for questions')
+        dialogue.add_extra_button(yes_to_all_label)
+        dialogue.add_extra_button(no_to_all_label)
+        dialogue.run()
+        button = dialogue.get_pressed_button()
+        if button is not None:
+            answer = (0 if button == yes_to_all_label else 1, b'')
+            self.put(key, *answer)
+            self._restore(dialogue, *answer)
+        return dialogue.exit_code
+
+    @staticmethod
+    def _is_secret(dialogue):
+        """
+        :return: whether the answer of the dialogue is a secret that must not be remembered
+        """
+        if isinstance(dialogue, PasswordEntry) or '--hide-text' in dialogue.arguments:
+            return True
+        return isinstance(dialogue, Forms) and any(field_type == 'password' for _, field_type in dialogue.fields)
+
+    @staticmethod
+    def _restore(dialogue, exit_code, output):
+        dialogue._stdout_data = bytearray(output)
+        dialogue.output = dialogue._stdout_data.decode()
+        dialogue._output_decoded = True
+        dialogue.exit_code = exit_code
+
+    def get(self, key):
+        """
+        :return: a tuple of the exit code and output remembered for the key, or None
+        """
+        with self._lock:
+            entry = self._answers.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= time.time():
+                del self._answers[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._answers.move_to_end(key)
+            self.hits += 1
+            return entry[1:]
+
+    def put(self, key, exit_code, output):
+        """
+        Remember an answer
+        :param key: the key of the answer
+        :param exit_code: the exit code of the dialogue
+        :param output: the standard output of the dialogue, as bytes
+        """
+        expiry = None if self.ttl is None else time.time() + self.ttl
+        with self._lock:
+            self._answers[key] = (expiry, exit_code, bytes(output))
+            self._answers.move_to_end(key)
+            while len(self._answers) > self.max_entries:
+                self._answers.popitem(last=False)
+
+    def clear(self):
+        """
+        Forget every answer
+        """
+        with self._lock:
+            self._answers.clear()
+
+    def _load(self):
+        try:
+            with open(self.path) as cache_file:
+                entries = json.load(cache_file)
+        except FileNotFoundError:
+            return
+        except ValueError as error:
+            raise ZenityError(f'{self.path} is not a valid answer cache: {error}')
+        now = time.time()
+        for key, expiry, exit_code, output in entries:
+            if expiry is None or expiry > now:
+                self._answers[_freeze(key)] = (expiry, exit_code, output.encode())
+        while len(self._answers) > self.max_entries:
+            self._answers.popitem(last=False)
+
+    def save(self):
+        """
+        Write the answers that have not expired to the JSON file of the cache. The file is created readable only by
+        its owner and replaced atomically
+        """
+        if self.path is None:
+            return
+        now = time.time()
+        with self._lock:
+            entries = [[key, expiry, exit_code, output.decode()]
+                       for key, (expiry, exit_code, output) in self._answers.items()
+                       if expiry is None or expiry > now]
+        # mkstemp creates the file with mode 0600 and a unique name, so that concurrent saves don't collide
+        descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)),
+                                                      prefix=os.path.basename(self.path), suffix='.tmp')
+        try:
+            with open(descriptor, 'w') as cache_file:
+                json.dump(entries, cache_file)
+            os.replace(temporary_path, self.path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    def close(self):
+        """
+        Save the answers, if the cache has a path
+        """
+        self.save()
+
+
+# the dialogues that can be created from a JSON spec, by class name - see create_dialogue
+DIALOGUE_CLASSES = {dialogue_class.__name__: dialogue_class for dialogue_class in (
+    DateSelection, FileSelection, List, Forms, ErrorMessage, WarningMessage, QuestionMessage, SingleLineEntry,
+    TextEntry, ColorSelection, ScaleSelection, PasswordEntry, Notification)}
+FORM_FIELD_TYPES = ('entry', 'password', 'calendar', 'list', 'combo')
+# options that make a dialogue read input streamed to it while it is open, which a JSON spec can't provide - without
+# it e.g. zenity --notification --listen would wait for the end of its input forever
+STREAMED_OPTIONS = ('listen', 'source')
+
+
+def create_dialogue(name, options=None):
+    """
+    Create a dialogue from a JSON compatible description
+    :param name: the name of the dialogue class, a key of DIALOGUE_CLASSES
+    :param options: the keyword arguments of the class. The fields of a Forms dialogue are given as a 'fields' list
+    of [field type, name, arguments...], e.g. ['combo', 'Size', ['small', 'large']]. Options that stream input to
+    the dialogue (see STREAMED_OPTIONS) are refused
+    :return: an unstarted dialogue
+    """
+    dialogue_class = DIALOGUE_CLASSES.get(name)
+    if dialogue_class is None:
+        raise ZenityError(f'{name} is not a dialogue class')
+    options = dict(options or {})
+    streamed = [option for option in STREAMED_OPTIONS if options.get(option)]
+    if streamed:
+        raise ZenityError(f'{", ".join(streamed)} can not be used in a dialogue spec, it requires streamed input')
+    fields = options.pop('fields', None)
+    if fields is not None and dialogue_class is not Forms:
+        raise ZenityError('only Forms dialogues have fields')
+    try:
+        dialogue = dialogue_class(**options)
+    except TypeError as error:
+        raise ZenityError(f'invalid options for {name}: {error}') from None
+    for field_type, *arguments in fields or ():
+        if field_type not in FORM_FIELD_TYPES:
+            raise ZenityError(f'{field_type} is not a form field type')
+        getattr(dialogue, f'add_{field_type}')(*arguments)
+    if dialogue._input_stream() is None:
+        # nothing will be written to the dialogue, give it an empty input instead of a pipe that is never closed
+        dialogue.uses_stdin = False
+    return dialogue
+
+
+def _jsonable(value):
+    """
+    :return: the result of a dialogue converted to JSON compatible types - dates to ISO strings, paths to strings and
+    sequences to lists
+    """
+    if isinstance(value, (datetime.date, pathlib.PurePath)):
+        return value.isoformat() if isinstance(value, datetime.date) else str(value)
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (tuple, list, Sequence)) and not isinstance(value, str):
+        return [_jsonable(item) for item in value]
+    return value
+
+
+def dialogue_answer(dialogue):
+    """
+    :return: a JSON compatible dict of the exit code, the output and the typed result of a finished dialogue
+    """
+    return {'exit_code': dialogue.exit_code, 'output': dialogue.get_output(),
+            'result': _jsonable(dialogue.get_result())}
+
+
+def default_broker_path():
+    """
+    :return: the default path of the socket of the dialogue broker - in the private runtime directory of the user if
+    there is one, and otherwise in a directory of the user in the temporary directory that only the user can access
+    (e.g. for cron jobs, which have no runtime directory)
+    """
+    runtime_directory = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_directory:
+        return os.path.join(runtime_directory, 'zenity-broker.sock')
+    directory = os.path.join(tempfile.gettempdir(), f'zenity-broker-{os.getuid()}')
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    directory_stat = os.lstat(directory)
+    if not stat.S_ISDIR(directory_stat.st_mode) or directory_stat.st_uid != os.getuid() or \
+            directory_stat.st_mode & 0o077:
+        raise ZenityError(f'{directory} is not a private directory of this user, refusing to use it for the broker')
+    return os.path.join(directory, 'broker.sock')
+
+
+def _peer_uid(connection):
+    """
+    :return: the user id of the process at the other end of a unix socket, or None where SO_PEERCRED is not supported
+    """
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return None
+    credentials = connection.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+    return struct.unpack('3i', credentials)[1]
+
+
+class _BrokerRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        if _peer_uid(self.connection) not in (None, os.getuid()):
+            # only the user running the broker may display dialogues on its screen
+            self.wfile.write(b'{"error": "permission denied"}\n')
+            return
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                future = self.server.broker.submit(request['dialogue'], request.get('options'),
+                                                   request.get('priority', 0))
+                response = future.result()
+            except (ValueError, KeyError, TypeError, AttributeError) as error:
+                response = {'error': f'invalid request: {error}'}
+            except ZenityError as error:
+                response = {'error': str(error)}
+            except Exception as error:
+                response = {'error': f'{type(error).__name__}: {error}'}
+            try:
+                self.wfile.write((json.dumps(response) + '\n').encode())
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+
+class DialogueBroker:
+    """
+    A resident daemon that displays dialogues on behalf of short lived scripts, so that they don't each spawn their
+    own processes and compete for the screen. Clients (see BrokerClient) connect to a unix socket and send one JSON
+    request per line:
+        {"dialogue": "QuestionMessage", "options": {"text": "Deploy?"}, "priority": 0}
+    and receive one JSON response per line, in order:
+        {"exit_code": 0, "output": "", "result": true} or {"error": "..."}
+    Dialogues are created with create_dialogue and displayed at most max_concurrent at a time, the pending requests
+    with the highest priority first and in order of arrival otherwise. Questions, messages and entries are displayed
+    by a WarmDialoguePool. The protocol is simple enough to use from a shell, e.g. with socat or nc -U
+    """
+    def __init__(self, path=None, max_concurrent=1, pool_size=1):
+        """
+        :param path: the path of the socket, default_broker_path() by default
+        :param max_concurrent: the maximum number of dialogues displayed at the same time
+        :param pool_size: the number of warm helpers, see WarmDialoguePool
+        """
+        self.path = path or default_broker_path()
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._remove_stale_socket()
+        # create the socket accessible only by this user, there is no window in which it has wider permissions
+        previous_umask = os.umask(0o177)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(self.path, _BrokerRequestHandler)
+        finally:
+            os.umask(previous_umask)
+        self._server.daemon_threads = True
+        self._server.broker = self
+        self._pool = WarmDialoguePool(pool_size)
+        self._workers = [threading.Thread(target=self._work, daemon=True, name='zenity-broker')
+                         for _ in range(max_concurrent)]
+        for worker in self._workers:
+            worker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _remove_stale_socket(self):
+        if not os.path.exists(self.path):
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(self.path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # left behind by a broker that didn't exit cleanly
+                os.unlink(self.path)
+                return
+        raise ZenityError(f'a broker is already listening on {self.path}')
+
+    def submit(self, name, options=None, priority=0):
+        """
+        Queue a dialogue
+        :param name: the name of the dialogue class, see create_dialogue
+        :param options: the keyword arguments of the dialogue class
+        :param priority: dialogues with a higher priority are displayed first
+        :return: a Future of the answer of the dialogue, see dialogue_answer
+        """
+        dialogue = create_dialogue(name, options)
+        future = Future()
+        self._queue.put((-priority, next(self._sequence), dialogue, future))
+        return future
+
+    def _work(self):
+        while True:
+            _, _, dialogue, future = self._queue.get()
+            if dialogue is None:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                self._pool.run(dialogue)
+                future.set_result(dialogue_answer(dialogue))
+            except Exception as error:
+                future.set_exception(error)
+
+    def serve_forever(self):
+        """
+        Serve clients until shutdown is called from another thread
+        """
+        self._server.serve_forever()
+
+    def shutdown(self):
+        """
+        Stop serve_forever
+        """
+        self._server.shutdown()
+
+    def close(self):
+        """
+        Stop accepting clients, display the dialogues already queued and remove the socket
+        """
+        self._server.server_close()
+        for _ in self._workers:
+            self._queue.put((float('inf'), next(self._sequence), None, None))
+        for worker in self._workers:
+            worker.join()
+        self._pool.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class BrokerClient:
+    """
+    A thin client of a DialogueBroker - a script displays dialogues with a socket round-trip instead of its own
+    zenity processes. The broker must be run by the same user. A client holds one connection and is not safe to share
+    between threads
+    """
+    def __init__(self, path=None, timeout=None):
+        """
+        :param path: the path of the socket of the broker, default_broker_path() by default
+        :param timeout: the maximum number of seconds to wait for an answer, None to wait forever
+        """
+        self.path = path or default_broker_path()
+        self.timeout = timeout
+        self._socket: Union[socket.socket, None] = None
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def request(self, dialogue, priority=0, **options):
+        """
+        Display a dialogue with the broker and wait for its answer
+        :param dialogue: the name of the dialogue class, e.g. 'QuestionMessage'
+        :param priority: dialogues with a higher priority are displayed first
+        :param options: the keyword arguments of the dialogue class
+        :return: the answer of the dialogue - a dict of exit_code, output and result
+        """
+        message = json.dumps({'dialogue': dialogue, 'options': options, 'priority': priority}) + '\n'
+        try:
+            if self._socket is None:
+                self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self._socket.settimeout(self.timeout)
+                self._socket.connect(self.path)
+                if _peer_uid(self._socket) not in (None, os.getuid()):
+                    # don't send prompts to, or trust the answers of, a socket another user bound first
+                    self.close()
+                    raise ZenityError(f'the broker on {self.path} belongs to another user')
+                self._file = self._socket.makefile('rwb')
+            self._file.write(message.encode())
+            self._file.flush()
+            line = self._file.readline()
+        except OSError as error:
+            self.close()
+            raise ZenityError(f'the broker on {self.path} is not available: {error}') from None
+        if not line:
+            self.close()
+            raise ZenityError(f'the broker on {self.path} closed the connection')
+        response = json.loads(line)
+        if 'error' in response:
+            raise ZenityError(response['error'])
+        return response
+
+    def close(self):
+        """
+        Close the connection to the broker
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+def run_batch(lines, output, max_concurrent=1):
+    """
+    Run dialogues described by JSON lines, e.g.
+        {"id": "confirm", "dialogue": "QuestionMessage", "options": {"text": "Deploy?"}}
+    see create_dialogue for the dialogue and options. Up to max_concurrent dialogues are displayed at a time, and a
+    line is only read when there is room for its dialogue - so a driving process can decide its next request based on
+    the previous answers. The answer of every dialogue is written as a JSON line as soon as it completes, with the id
+    of its request (the line number by default) and either the fields of dialogue_answer or an error
+    :param lines: an iterable of JSON lines, e.g. a text file
+    :param output: a text file the answers are written to
+    :param max_concurrent: the maximum number of dialogues displayed at the same time
+    :return: the number of requests that failed
+    """
+    output_lock = threading.Lock()
+    slots = threading.BoundedSemaphore(max_concurrent)
+    failures = 0
+
+    def respond(answer):
+        nonlocal failures
+        with output_lock:
+            failures += 'error' in answer
+            output.write(json.dumps(answer) + '\n')
+            output.flush()
+
+    def run(identifier, dialogue):
+        try:
+            dialogue.run()
+            respond({'id': identifier, **dialogue_answer(dialogue)})
+        except Exception as error:
+            respond({'id': identifier, 'error': str(error) if isinstance(error, ZenityError) else
+                     f'{type(error).__name__}: {error}'})
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix='zenity-batch') as executor:
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            identifier = number
+            try:
+                request = json.loads(line)
+                identifier = request.get('id', number)
+                dialogue = create_dialogue(request['dialogue'], request.get('options'))
+            except (ValueError, KeyError, TypeError, AttributeError) as error:
+                respond({'id': identifier, 'error': f'invalid request: {error}'})
+                continue
+            except ZenityError as error:
+                respond({'id': identifier, 'error': str(error)})
+                continue
+            slots.acquire()
+            executor.submit(run, identifier, dialogue)
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m zenity',
+        description='Run the dialogues described by JSON lines read from standard input, writing their answers to '
+                    'standard output as JSON lines as they complete - see run_batch. With --broker, serve dialogues '
+                    'to clients connecting to a unix socket instead - see DialogueBroker.')
+    parser.add_argument('--input', help='read the dialogues from this file instead of standard input')
+    parser.add_argument('--max-concurrent', type=int, default=1,
+                        help='the maximum number of dialogues displayed at the same time')
+    parser.add_argument('--broker', action='store_true',
+                        help='run a dialogue broker that displays dialogues for clients connecting to a unix socket')
+    parser.add_argument('--socket', help='the path of the socket of the broker')
+    arguments = parser.parse_args(argv)
+    if arguments.max_concurrent < 1:
+        parser.error('--max-concurrent must be positive')
+
+    if arguments.broker:
+        with DialogueBroker(arguments.socket, arguments.max_concurrent) as broker:
+            # stop cleanly, removing the socket, when the daemon is terminated
+            signal.signal(signal.SIGTERM, signal.default_int_handler)
+            try:
+                broker.serve_forever()
+            except KeyboardInterrupt:
+                pass
+        return 0
+
+    if arguments.input is None:
+        return 1 if run_batch(sys.stdin, sys.stdout, arguments.max_concurrent) else 0
+    with open(arguments.input) as lines:
+        return 1 if run_batch(lines, sys.stdout, arguments.max_concurrent) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
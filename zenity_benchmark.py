@@ -0,0 +1,206 @@
+"""
+Benchmarks for the hot paths of the zenity wrapper, run against the bundled fake zenity by default so they need no
+display. Every result is printed as a JSON line so that regressions can be tracked across commits, e.g.
+
+    python zenity_benchmark.py --output bench_output.txt
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import zenity
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def timed(function, repeat):
+    """
+    Run a function several times
+    :param function: the function to time
+    :param repeat: the number of runs
+    :return: the duration of each run in seconds
+    """
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def bench_list_arguments(rows, repeat):
+    """
+    The time it takes to build the arguments of a List with many rows, and to encode the same rows for streaming
+    """
+    data = [(i, f'name {i}', i * 2.5) for i in range(rows)]
+    columns = ('id', 'name', 'value')
+    yield 'list_arguments', statistics.median(timed(lambda: zenity.List(columns, rows=data), repeat)), 's', \
+        {'rows': rows}
+
+    def encode_streamed():
+        lst = zenity.List(columns, rows=data, stream_rows=True)
+        for _ in lst._input_stream():
+            pass
+
+    yield 'list_stream_encoding', statistics.median(timed(encode_streamed, repeat)), 's', {'rows': rows}
+
+
+def bench_spawn(runs):
+    """
+    The time it takes to run a dialogue of every class from start to exit, dominated by the process spawn
+    """
+    dialogues = {
+        'DateSelection': lambda: zenity.DateSelection(),
+        'FileSelection': lambda: zenity.FileSelection(),
+        'List': lambda: zenity.List(('a',), rows=[('1',)]),
+        'ErrorMessage': lambda: zenity.ErrorMessage(text='text'),
+        'WarningMessage': lambda: zenity.WarningMessage(text='text'),
+        'QuestionMessage': lambda: zenity.QuestionMessage(text='text'),
+        'SingleLineEntry': lambda: zenity.SingleLineEntry(text='text'),
+        'PasswordEntry': lambda: zenity.PasswordEntry(),
+        'ColorSelection': lambda: zenity.ColorSelection(),
+        'ScaleSelection': lambda: zenity.ScaleSelection(),
+        'Forms': lambda: zenity.Forms().add_entry('name'),
+        'Notification': lambda: zenity.Notification(text='text'),
+    }
+    for name, create in dialogues.items():
+        durations = timed(lambda: create().run(), runs)
+        yield 'spawn', statistics.median(durations), 's', {'dialogue': name, 'runs': runs}
+
+
+def bench_progress_updates(updates):
+    """
+    The number of progress updates per second a reporting loop can make, writing directly and coalescing
+    """
+    for max_refresh_rate in (None, 30):
+        bar = zenity.ProgressBar(max_refresh_rate=max_refresh_rate)
+        bar.start()
+        started = time.perf_counter()
+        for i in range(updates):
+            bar.update_progress(i * 100 // updates)
+        elapsed = time.perf_counter() - started
+        bar.update_progress(100)
+        bar.finish()
+        bar.wait()
+        yield 'progress_updates', updates / elapsed, 'updates/s', {'max_refresh_rate': max_refresh_rate,
+                                                                    'updates': updates}
+
+
+def bench_input_writer(lines):
+    """
+    The number of lines per second written to a progress bar with send_input one line at a time, and in bulk with an
+    InputWriter
+    """
+    data = [f'{i * 100 // lines}\n' for i in range(lines)]
+
+    def with_send_input(bar):
+        for line in data:
+            bar.send_input(line)
+
+    def with_writer(bar):
+        with bar.input_writer() as writer:
+            writer.write(data)
+
+    for method, write in (('send_input', with_send_input), ('input_writer', with_writer)):
+        bar = zenity.ProgressBar()
+        bar.start()
+        started = time.perf_counter()
+        write(bar)
+        elapsed = time.perf_counter() - started
+        bar.finish()
+        bar.wait()
+        yield 'input_writer', lines / elapsed, 'lines/s', {'method': method, 'lines': lines}
+
+
+def bench_copy(megabytes, repeat):
+    """
+    The throughput of copy_with_progress, between files and from a buffered file object, next to a plain copy. It
+    includes starting the progress bar, which dominates small copies
+    """
+    size = megabytes * 1024 * 1024
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'source')
+        destination = os.path.join(directory, 'destination')
+        with open(source, 'wb') as source_file:
+            source_file.write(os.urandom(1024 * 1024) * megabytes)
+
+        def copy_objects():
+            with open(source, 'rb') as source_file, open(destination, 'wb') as destination_file:
+                zenity.copy_with_progress(source_file, destination_file)
+
+        for method, copy in (('shutil.copyfile', lambda: shutil.copyfile(source, destination)),
+                             ('copy_with_progress', lambda: zenity.copy_with_progress(source, destination)),
+                             ('copy_with_progress_objects', copy_objects)):
+            yield 'copy', size / statistics.median(timed(copy, repeat)), 'bytes/s', {'method': method, 'size': size}
+
+
+def bench_file_selection_parse(files, repeat):
+    """
+    The time it takes to collect and split the output of a multiple FileSelection with many selected files, as strings
+    and as the typed paths returned by get_result
+    """
+    data = ('|'.join(f'/home/user/Documents/project/file-{i:06}.txt' for i in range(files)) + '\n').encode()
+
+    def finished_selection():
+        selection = zenity.FileSelection(multiple=True)
+        selection._receive(data, False)
+        selection._finish(0)
+        return selection
+
+    def parse():
+        return finished_selection().output.rstrip('\n').split('|')
+
+    def parse_paths():
+        return list(finished_selection().get_result())
+
+    yield 'file_selection_parse', statistics.median(timed(parse, repeat)), 's', {'files': files}
+    yield 'file_selection_paths', statistics.median(timed(parse_paths, repeat)), 's', {'files': files}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--real', action='store_true', help='benchmark against the installed zenity')
+    parser.add_argument('--quick', action='store_true', help='use smaller inputs, for a fast smoke run')
+    parser.add_argument('--output', help='append the results to this file instead of printing them')
+    arguments = parser.parse_args(argv)
+
+    if not arguments.real:
+        zenity.set_backend(zenity.FAKE_ZENITY)
+    scale = 10 if arguments.quick else 1
+    benchmarks = [bench_list_arguments(100000 // scale, 5),
+                  bench_spawn(10 // scale or 1),
+                  bench_progress_updates(100000 // scale),
+                  bench_input_writer(100000 // scale),
+                  bench_copy(256 // scale, 3),
+                  bench_file_selection_parse(10000 // scale, 20)]
+
+    context = {'revision': git_revision(), 'python': platform.python_version(),
+               'backend': ' '.join(zenity.get_backend())}
+    output = open(arguments.output, 'a') if arguments.output else sys.stdout
+    try:
+        for benchmark in benchmarks:
+            for name, value, unit, parameters in benchmark:
+                record = {'benchmark': name, 'value': value, 'unit': unit, 'parameters': parameters, **context}
+                output.write(json.dumps(record) + '\n')
+                output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+A resident GTK helper for zenity.WarmDialoguePool. It initialises GTK once at startup - the part of a zenity launch
+that dominates the time to first paint - and then displays dialogues on request, so that a prompt repeated in an
+interactive workflow appears at once.
+
+It requires PyGObject (the gi module) and a display. The protocol is JSON lines:
+  on startup the helper writes {"ready": true}, or {"ready": false} if GTK is not usable, and exits in that case
+  requests are read from standard input as {"arguments": [zenity arguments, without the executable]}
+  every request is answered with {"exit_code": int, "output": str}, or {"unsupported": true} for dialogues the
+  helper does not implement, which the pool then runs with zenity itself
+Only the question, info, warning, error and entry dialogues are implemented, with the options in SUPPORTED_OPTIONS -
+a dialogue with any other option (e.g. --timeout or --extra-button) is answered as unsupported rather than displayed
+without it.
+"""
+
+import json
+import sys
+
+MESSAGE_TYPES = ('question', 'info', 'warning', 'error')
+SUPPORTED_OPTIONS = frozenset(MESSAGE_TYPES + ('entry', 'title', 'text', 'ok-label', 'cancel-label', 'width', 'height',
+                                               'window-icon', 'entry-text', 'hide-text'))
+
+
+def respond(message):
+    sys.stdout.write(json.dumps(message) + '\n')
+    sys.stdout.flush()
+
+
+def parse_arguments(arguments):
+    options = {}
+    positionals = []
+    for argument in arguments:
+        if argument.startswith('--'):
+            name, has_value, value = argument[2:].partition('=')
+            options[name] = value if has_value else True
+        else:
+            positionals.append(argument)
+    return options, positionals
+
+
+def build_dialogue(Gtk, options, positionals):
+    """
+    :return: a tuple of the dialogue and its entry (None for message dialogues), or None if unsupported
+    """
+    dialogue_type = next((name for name in MESSAGE_TYPES + ('entry',) if name in options), None)
+    if dialogue_type is None or not SUPPORTED_OPTIONS.issuperset(options):
+        return None
+    if dialogue_type == 'entry':
+        dialogue = Gtk.Dialog()
+        dialogue.add_button(options.get('cancel-label', 'Cancel'), Gtk.ResponseType.CANCEL)
+        dialogue.add_button(options.get('ok-label', 'OK'), Gtk.ResponseType.OK)
+        dialogue.set_default_response(Gtk.ResponseType.OK)
+        content = dialogue.get_content_area()
+        if 'text' in options:
+            content.pack_start(Gtk.Label(label=options['text'], xalign=0), False, False, 6)
+        entry = Gtk.Entry()
+        entry.set_text(options.get('entry-text', positionals[0] if positionals else ''))
+        entry.set_visibility('hide-text' not in options)
+        entry.set_activates_default(True)
+        content.pack_start(entry, False, False, 6)
+    else:
+        message_type = {'question': Gtk.MessageType.QUESTION, 'info': Gtk.MessageType.INFO,
+                        'warning': Gtk.MessageType.WARNING, 'error': Gtk.MessageType.ERROR}[dialogue_type]
+        dialogue = Gtk.MessageDialog(message_type=message_type, text=options.get('text', ''))
+        if dialogue_type == 'question':
+            dialogue.add_button(options.get('cancel-label', 'No'), Gtk.ResponseType.CANCEL)
+            dialogue.add_button(options.get('ok-label', 'Yes'), Gtk.ResponseType.OK)
+        else:
+            dialogue.add_button(options.get('ok-label', 'OK'), Gtk.ResponseType.OK)
+        entry = None
+    dialogue.set_title(options.get('title', ''))
+    dialogue.set_default_size(int(options.get('width', -1)), int(options.get('height', -1)))
+    if 'window-icon' in options:
+        try:
+            dialogue.set_icon_from_file(options['window-icon'])
+        except Exception:
+            pass
+    return dialogue, entry
+
+
+def main():
+    try:
+        import gi
+        gi.require_version('Gtk', '3.0')
+        from gi.repository import Gtk
+        usable = Gtk.init_check(sys.argv)[0]
+    except (ImportError, ValueError):
+        usable = False
+    respond({'ready': bool(usable)})
+    if not usable:
+        return 1
+
+    for line in sys.stdin:
+        options, positionals = parse_arguments(json.loads(line)['arguments'])
+        built = build_dialogue(Gtk, options, positionals)
+        if built is None:
+            respond({'unsupported': True})
+            continue
+        dialogue, entry = built
+        dialogue.show_all()
+        accepted = dialogue.run() == Gtk.ResponseType.OK
+        output = entry.get_text() + '\n' if accepted and entry is not None else ''
+        dialogue.destroy()
+        while Gtk.events_pending():
+            Gtk.main_iteration()
+        respond({'exit_code': 0 if accepted else 1, 'output': output})
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
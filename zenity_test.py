@@ -1,11 +1,28 @@
+import asyncio
+import shutil
 import time
 
+import zenity
+
 from zenity import DateSelection, List, ErrorMessage, FileSelection, SingleLineEntry, Notification, ProgressBar, \
-    QuestionMessage, TextEntry, WarningMessage, ColorSelection, PasswordEntry, ScaleSelection
+    QuestionMessage, TextEntry, WarningMessage, ColorSelection, PasswordEntry, ScaleSelection, progress, \
+    ProgressAggregator, Forms, NotificationDaemon, DialogueScheduler
 
 import datetime
+import io
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 
+if shutil.which('zenity') is None and 'ZENITY_BACKEND' not in os.environ:
+    # zenity is not installed (e.g. in CI) - answer the dialogues with the bundled stand-in instead
+    zenity.set_backend(zenity.FAKE_ZENITY)
+
 
 def section_separator(func):
     @wraps(func)
@@ -99,6 +116,7 @@ def test_date():
                       height=100)
     d.run()
     print('output:', d.get_output())
+    print('date:', d.get_result())
 
 
 @section_separator
@@ -133,6 +151,7 @@ def test_list():
     lst = List(**options)
     lst.run()
     print('output:', lst.get_output())
+    print('rows:', lst.get_result())
     print()
 
     print('List test: testing editable')
@@ -144,6 +163,43 @@ def test_list():
     print()
 
 
+@section_separator
+def test_streamed_list():
+    options = {'column_names': ('index', 'square'),
+               'rows': ((i, i * i) for i in range(50000)),
+               'stream_rows': True,
+               'text': 'please choose a row',
+               'title': "Streamed List Test",
+               'window_icon': '/home/user/Desktop/update.png',
+               'width': 500,
+               'height': 400}
+
+    print('List test: testing rows streamed from a generator')
+    lst = List(**options)
+    lst.run()
+    print('output:', lst.get_output())
+
+
+@section_separator
+def test_forms():
+    options = {'text': 'please fill in the form',
+               'title': 'Forms Test',
+               'separator': '|',
+               'show_header': True,
+               'window_icon': '/home/user/Desktop/update.png',
+               'ok_label': 'Ok :-)',
+               'cancel_label': 'Cancel :-(',
+               'width': 500,
+               'height': 400}
+
+    f = Forms(**options)
+    f.add_entry('name').add_password('password').add_calendar('birthday')
+    f.add_list('language', ['python', 'c', 'rust'])
+    f.add_combo('shell', ['bash', 'zsh', 'fish'])
+    f.run()
+    print('output:', f.get_values())
+
+
 @section_separator
 def test_file_selection():
     options = {'multiple': False,
@@ -164,6 +220,7 @@ def test_file_selection():
     f = FileSelection(**options)
     f.run()
     print('output:', f.get_output())
+    print('paths:', f.get_result())
 
     print('File Selection test: testing single directory')
     options['multiple'] = False
@@ -221,6 +278,128 @@ def test_progress():
     p.stop()
 
 
+@section_separator
+def test_progress_track():
+    options = {'window_icon': '/home/user/Desktop/update.png',
+               'ok_label': 'Ok :-)',
+               'cancel_label': 'Cancel :-(',
+               'width': 500,
+               'height': 400}
+    print('Progress test: testing a known total')
+    p = ProgressBar(text='this is text', title='Progress', auto_close=True, **options)
+    for _ in p.track(range(100)):
+        time.sleep(0.1)
+
+    print('Progress test: testing an unknown total')
+    for _ in progress((i for i in range(50)), text='this is text', title='Progress', **options):
+        time.sleep(0.1)
+
+    print('Progress test: testing a bar closed while tracking')
+    for max_refresh_rate in (None, 30):
+        p = ProgressBar(text='this bar is closed after 5 items', title='Progress', max_refresh_rate=max_refresh_rate)
+        consumed = 0
+        try:
+            for i in p.track(range(40)):
+                consumed += 1
+                if i == 5:
+                    p.zenity_process.terminate()
+                time.sleep(0.05)
+        except zenity.ZenityError as error:
+            print('cancelled:', error)
+        assert p.cancelled and consumed < 40
+
+
+@section_separator
+def test_aggregated_progress():
+    def work(reporter):
+        for i in range(25):
+            reporter.set_message(f'worker {reporter.slot} is on item {i}')
+            time.sleep(0.1)
+            reporter.advance()
+
+    bar = ProgressBar(text='this is text', title='Aggregated Progress', auto_close=True)
+    with ProgressAggregator(100, 4, bar=bar) as aggregator:
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(work, [aggregator.reporter(slot) for slot in range(4)]))
+
+
+@section_separator
+def test_coalescing_progress():
+    p = ProgressBar(text='this is text', title='Coalescing Progress', percentage=0, auto_close=True,
+                    max_refresh_rate=30)
+    p.start()
+    total = 1000000
+    for i in range(total):
+        p.update_message(f'this is update {i}')
+        p.update_progress(i * 100 // total)
+    p.update_progress(100)
+    p.finish()
+    assert p.wait() == 0
+
+    print('Coalescing progress test: testing a bar whose input is closed with an update pending')
+    errors = []
+    excepthook, threading.excepthook = threading.excepthook, errors.append
+    # keeps the fake backend open after its input ends, like a real dialogue
+    os.environ['FAKE_ZENITY_DELAY'] = '0.5'
+    try:
+        p = ProgressBar(text='this is closed', title='Coalescing Progress', auto_close=True, max_refresh_rate=30)
+        p.start()
+        p.update_progress(100)
+        p.zenity_process.stdin.close()
+        time.sleep(0.1)
+        p.wait()
+    finally:
+        threading.excepthook = excepthook
+        del os.environ['FAKE_ZENITY_DELAY']
+    assert not errors and not p.cancelled
+
+
+@section_separator
+def test_async_accessors():
+    async def run_question():
+        q = QuestionMessage(text='this is read while it runs', title='Title')
+        await q.astart()
+        assert q.get_result() is None
+        await asyncio.sleep(1)
+        try:
+            q.get_output()
+        except zenity.ZenityError as error:
+            print('error:', error)
+        else:
+            raise AssertionError('an exited asyncio process must be read with aget_output')
+        await q.aget_output()
+        return q
+
+    print('Async accessors test: testing the synchronous accessors of a dialogue started with astart')
+    backend = zenity.get_backend()
+    zenity.set_backend(zenity.FAKE_ZENITY)
+    os.environ['FAKE_ZENITY_DELAY'] = '0.5'
+    try:
+        q = asyncio.run(run_question())
+    finally:
+        del os.environ['FAKE_ZENITY_DELAY']
+        zenity.set_backend(backend)
+    assert q.exit_code == 0 and q.get_output() == ''
+
+
+@section_separator
+def test_async_progress():
+    async def run_bar(index):
+        p = ProgressBar(text=f'this is bar {index}', title='Async Progress', percentage=0, auto_close=True)
+        await p.astart()
+        for i in range(100):
+            await p.aupdate_message(f'bar {index} update {i}')
+            await p.aupdate_progress(i)
+            await asyncio.sleep(0.05)
+        await p.aupdate_progress(100)
+        await p.astop()
+
+    async def run_all():
+        await asyncio.gather(*(run_bar(index) for index in range(3)))
+
+    asyncio.run(run_all())
+
+
 @section_separator
 def test_text_entry():
     options = {'title': 'Title',
@@ -244,6 +423,69 @@ def test_text_entry():
     print('output:', t.get_output())
 
 
+@section_separator
+def test_streamed_text_entry():
+    def follow():
+        for i in range(100):
+            yield f'this is log line {i}\n'
+            time.sleep(0.1)
+
+    options = {'title': 'Title',
+               'source': follow(),
+               'auto_scroll': True,
+               'overflow': 'drop',
+               'window_icon': '/home/user/Desktop/update.png',
+               'ok_label': 'Ok :-)',
+               'cancel_label': 'Cancel :-(',
+               'width': 500,
+               'height': 400}
+
+    print('text entry: testing a streamed log')
+    t = TextEntry(**options)
+    t.run()
+    print('output:', t.get_output(), 'dropped:', t.dropped_chunks)
+
+
+@section_separator
+def test_dialogue_spec():
+    spec = zenity.DialogueSpec(WarningMessage, title='Title', window_icon='/home/user/Desktop/update.png',
+                               ok_label='Ok :-)', width=500, height=400)
+
+    print('Spec test: testing dialogues created from a spec')
+    for i in range(3):
+        w = spec.create(text=f'this is warning {i}')
+        print('arguments:', w.arguments)
+        assert w.arguments == WarningMessage(text=f'this is warning {i}', title='Title',
+                                             window_icon='/home/user/Desktop/update.png', ok_label='Ok :-)',
+                                             width=500, height=400).arguments
+        w.run()
+    assert spec.replace(text='this is warning 0') is spec.replace(text='this is warning 0')
+
+    print('Spec test: testing that specs are immutable and per-run data is not memoized')
+    try:
+        spec.options['title'] = 'Changed'
+    except TypeError:
+        pass
+    else:
+        raise AssertionError('the options of a spec must be read-only')
+    list_spec = zenity.DialogueSpec(List, column_names=('number',), title='Title')
+    rows = iter([('1',), ('2',)])
+    assert list_spec.create(rows=rows) is not list_spec.create(rows=rows)
+    assert list_spec.replace(rows=[('1',)]) is not list_spec.replace(rows=[('1',)])
+    assert not list_spec._derived
+    try:
+        zenity.DialogueSpec(List, column_names=('number',), rows=iter([('1',), ('2',)]), stream_rows=True)
+    except zenity.ZenityError as error:
+        print('error:', error)
+    else:
+        raise AssertionError('a spec must not share an iterator between its dialogues')
+    rows = [['1'], ['2']]
+    rows_spec = zenity.DialogueSpec(List, column_names=('number',), rows=rows, stream_rows=True)
+    first, second = rows_spec.create(), rows_spec.create()
+    assert first is not second and first.__dict__ is not second.__dict__
+    assert b''.join(first._input_stream()) == b''.join(second._input_stream()) == b'1\n2\n'
+
+
 @section_separator
 def test_warning():
     options = {'text': 'this is text',
@@ -272,6 +514,18 @@ def test_error():
     e.run()
 
 
+@section_separator
+def test_scheduler():
+    with DialogueScheduler(max_concurrent=2, error_batch_window=0.5) as scheduler:
+        print('Scheduler test: testing identical warnings share one dialogue')
+        futures = [scheduler.submit(WarningMessage(text='this is text', title='Title')) for _ in range(10)]
+        print('output:', [future.result() for future in futures])
+
+        print('Scheduler test: testing a burst of errors is batched')
+        futures = [scheduler.submit_error(f'this is error {i}', 'Title') for i in range(10)]
+        print('output:', [future.result() for future in futures])
+
+
 @section_separator
 def test_notification():
     options = {'text': 'this is text',
@@ -285,6 +539,430 @@ def test_notification():
     n.run()
 
 
+@section_separator
+def test_notification_daemon():
+    print('Notification test: testing a persistent notification process')
+    with NotificationDaemon(text='this is text', window_icon='/home/user/Desktop/update.png') as n:
+        n.tooltip('this is a tooltip')
+        for i in range(5):
+            n.message(f'this is message {i}')
+            time.sleep(1)
+        n.visible(False)
+
+
+@section_separator
+def test_fake_backend():
+    backend = zenity.get_backend()
+    zenity.set_backend(zenity.FAKE_ZENITY)
+    with tempfile.TemporaryDirectory() as directory:
+        log_path = os.path.join(directory, 'log.jsonl')
+        os.environ['FAKE_ZENITY_LOG'] = log_path
+        try:
+            print('Fake backend test: testing streamed list rows')
+            lst = List(('first', 'second'), rows=((i, i * 2) for i in range(1000)), stream_rows=True,
+                       select_col='ALL')
+            lst.run()
+            print('output:', lst.get_output())
+            assert lst.get_output() == '0|0\n'
+
+            print('Fake backend test: testing progress updates')
+            p = ProgressBar(text='this is text', auto_close=True)
+            for _ in p.track(range(10)):
+                pass
+
+            print('Fake backend test: testing that a fast reader loses no text with the drop policy')
+            t = TextEntry(source=(f'line {i}\n' for i in range(20000)), overflow='drop', editable=True)
+            t.run()
+            assert t.dropped_chunks == 0 and len(t.get_output().splitlines()) == 20000
+
+            print('Fake backend test: testing waiting for a pipe above FD_SETSIZE')
+            read_fd, write_fd = os.pipe()
+            high_fd = 2048
+            try:
+                os.dup2(write_fd, high_fd)
+                assert zenity._wait_ready(high_fd, zenity.selectors.EVENT_WRITE, timeout=1)
+                os.close(high_fd)
+            except OSError:
+                # the descriptor limit is too low to test
+                pass
+            finally:
+                os.close(read_fd)
+                os.close(write_fd)
+
+            with open(log_path) as log_file:
+                list_log, progress_log, _ = [json.loads(line) for line in log_file]
+            assert list_log['stdin'].splitlines() == [str(cell) for i in range(1000) for cell in (i, i * 2)]
+            assert '100' in progress_log['stdin'].splitlines()
+
+            print('Fake backend test: testing that a streamed cell with a line break is refused')
+            lst = List(('first', 'second'), rows=[('x', 'y'), ('x\ny', 'z')], stream_rows=True, select_col='ALL')
+            try:
+                lst.run()
+            except zenity.ZenityError as error:
+                print('error:', error)
+            else:
+                raise AssertionError('a line break must not shift the streamed cells')
+
+            print('Fake backend test: testing a dialogue writing more than a pipe buffer of standard error')
+            script_path = os.path.join(directory, 'script.json')
+            with open(script_path, 'w') as script_file:
+                json.dump({'question': {'stderr': 'Gtk-WARNING\n' * zenity.STDERR_LIMIT + 'last warning\n'}},
+                          script_file)
+            os.environ['FAKE_ZENITY_SCRIPT'] = script_path
+            q = QuestionMessage(text='this is chatty')
+            assert q.run(timeout=30) == 0
+            assert len(q.get_errors()) <= zenity.STDERR_LIMIT
+            assert q.get_errors().endswith('last warning\n')
+        finally:
+            del os.environ['FAKE_ZENITY_LOG']
+            os.environ.pop('FAKE_ZENITY_SCRIPT', None)
+            zenity.set_backend(backend)
+
+
+@section_separator
+def test_typed_results():
+    print('Typed results test: testing the parsed results of every dialogue type')
+    backend = zenity.get_backend()
+    zenity.set_backend(zenity.FAKE_ZENITY)
+    with tempfile.TemporaryDirectory() as directory:
+        script_path = os.path.join(directory, 'script.json')
+        with open(script_path, 'w') as script_file:
+            json.dump({'calendar': {'output': '29/02/2024'},
+                       'file-selection': [{'output': '/tmp/a|b.txt|/tmp/c'}, {'output': '/tmp/single|name'}],
+                       'color-selection': [{'output': '#ffff00008080'}, {'output': 'rgba(1,2,3,0.5)'},
+                                           {'output': 'rgb(255,0,0)'}],
+                       'scale': [{'output': '42'}, {'exit_code': 1}],
+                       'password': {'output': 'user|pass|word'}}, script_file)
+        os.environ['FAKE_ZENITY_SCRIPT'] = script_path
+        try:
+            d = DateSelection()
+            d.run()
+            assert d.get_result() == datetime.date(2024, 2, 29)
+
+            f = FileSelection(multiple=True)
+            f.run()
+            assert list(f.get_result()) == [pathlib.Path('/tmp/a|b.txt'), pathlib.Path('/tmp/c')]
+            assert len(f.get_result()) == 2 and f.get_result()[-1] == pathlib.Path('/tmp/c')
+            f = FileSelection()
+            f.run()
+            assert f.get_result() == pathlib.Path('/tmp/single|name')
+
+            colors = []
+            for _ in range(3):
+                c = ColorSelection()
+                c.run()
+                colors.append(c.get_result())
+            assert colors == [(255, 0, 128), (1, 2, 3), (255, 0, 0)]
+
+            s = ScaleSelection(initial_value=10)
+            s.run()
+            assert s.get_result() == 42
+            s = ScaleSelection()
+            s.run()
+            assert s.get_result() is None
+
+            p = PasswordEntry(username=True)
+            p.run()
+            assert p.get_result() == ('user', 'pass|word')
+        finally:
+            del os.environ['FAKE_ZENITY_SCRIPT']
+            zenity.set_backend(backend)
+
+
+@section_separator
+def test_process_launch():
+    print('Launch test: testing that dialogues which read nothing get no input pipe')
+    backend = zenity.get_backend()
+    with tempfile.TemporaryDirectory() as directory:
+        count_path = os.path.join(directory, 'count')
+        wrapper_path = os.path.join(directory, 'zenity-wrapper')
+        with open(wrapper_path, 'w') as wrapper_file:
+            wrapper_file.write(f'#!/bin/sh\necho "$@" >> {count_path}\n'
+                               f'exec {sys.executable} {zenity.FAKE_ZENITY} "$@"\n')
+        os.chmod(wrapper_path, 0o700)
+        zenity.set_backend(wrapper_path)
+        try:
+            q = QuestionMessage(text='this reads nothing')
+            q.start()
+            assert q.zenity_process.stdin is None
+            assert q.wait() == 0
+            p = ProgressBar(auto_close=True)
+            p.start()
+            assert p.zenity_process.stdin is not None
+            p.update_progress(100)
+            p.finish()
+            p.wait()
+
+            print('Launch test: testing that the executable and the version are looked up once')
+            resolved = zenity.resolve_executable.cache_info().hits
+            QuestionMessage(text='this is resolved from the cache').run()
+            assert zenity.resolve_executable.cache_info().hits > resolved
+            assert zenity.get_zenity_version() == zenity.get_zenity_version() == '3.42.1'
+            with open(count_path) as count_file:
+                assert [line.strip() for line in count_file].count('--version') == 1
+        finally:
+            zenity.set_backend(backend)
+
+
+@section_separator
+def test_paged_list():
+    print('Paged list test: testing a million rows, a page at a time')
+    rows = [(i, f'name {i}') for i in range(1000000)]
+    paged = zenity.PagedList(('id', 'name'), rows, page_size=100, select_col='ALL', title='Title')
+    paged.run()
+    print('result:', paged.get_result())
+
+    print('Paged list test: testing scripted navigation with the fake backend')
+    backend = zenity.get_backend()
+    zenity.set_backend(zenity.FAKE_ZENITY)
+    with tempfile.TemporaryDirectory() as directory:
+        script_path = os.path.join(directory, 'script.json')
+        with open(script_path, 'w') as script_file:
+            json.dump({'list': [{'output': 'Next', 'exit_code': 1}, {'output': 'Search', 'exit_code': 1},
+                                {'output': 'Previous', 'exit_code': 1}, {}],
+                       'entry': {'output': 'name 777'}}, script_file)
+        os.environ['FAKE_ZENITY_SCRIPT'] = script_path
+        try:
+            paged = zenity.PagedList(('id', 'name'), rows, page_size=100, select_col='ALL')
+            assert paged.run() == 0
+            assert paged.get_result() == [('677', 'name 677')]
+        finally:
+            del os.environ['FAKE_ZENITY_SCRIPT']
+            zenity.set_backend(backend)
+
+
+@section_separator
+def test_input_writer():
+    print('Input writer test: testing bulk progress updates')
+    p = ProgressBar(text='this is text', title='Title', auto_close=True)
+    p.start()
+    with p.input_writer() as writer:
+        writer.write(f'{percentage}\n'.encode() for percentage in range(101))
+        writer.write(['# ', 'done', b'\n'])
+    p.wait()
+    print('bytes written:', writer.bytes_written)
+    assert writer.bytes_written == p.bytes_in
+
+    print('Input writer test: testing a dialogue closed mid-stream')
+    p = ProgressBar(text='this is closed immediately', title='Title')
+    p.start()
+    writer = p.input_writer()
+    p.stop()
+    while writer.write('50\n' * 10000):
+        pass
+    writer.close()
+    assert writer.broken
+
+
+@section_separator
+def test_copy_progress():
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'source')
+        destination = os.path.join(directory, 'destination')
+        with open(source, 'wb') as source_file:
+            source_file.write(os.urandom(1024 * 1024) * 64)
+
+        print('Copy progress test: testing a file copy')
+        copied = zenity.copy_with_progress(source, destination, text='copying', title='Title')
+        print('bytes copied:', copied)
+        assert copied == os.path.getsize(destination) == os.path.getsize(source)
+
+        print('Copy progress test: testing a wrapped stream')
+        with open(source, 'rb') as source_file, zenity.ProgressFile(source_file, title='Title') as tracked:
+            while tracked.read(100000):
+                pass
+        assert tracked.bytes_transferred == os.path.getsize(source)
+
+        print('Copy progress test: testing a transfer cancelled by closing a coalescing bar')
+        bar = ProgressBar(text='this bar is closed', title='Title', max_refresh_rate=30)
+        try:
+            with open(source, 'rb') as source_file, zenity.ProgressFile(source_file, bar=bar) as tracked:
+                bar.zenity_process.terminate()
+                while tracked.read(100000):
+                    time.sleep(0.01)
+        except zenity.ZenityError as error:
+            print('cancelled:', error)
+        assert bar.cancelled and bar.zenity_process.returncode is not None
+
+
+@section_separator
+def test_answer_cache():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'answers.json')
+        print('Answer cache test: testing a question asked for every file')
+        with zenity.AnswerCache(ttl=60, path=path) as cache:
+            for i in range(5):
+                q = QuestionMessage(text=f'overwrite file-{i}?', title='Title')
+                cache.run(q, key='overwrite', apply_to_all=True)
+                print(f'file-{i}:', q.get_result())
+
+            print('Answer cache test: testing a repeated entry')
+            for _ in range(3):
+                e = SingleLineEntry(text='asked only once', title='Title', entry_text='text')
+                cache.run(e)
+                print('answer:', e.get_result())
+            assert cache.hits >= 2
+
+            print('Answer cache test: testing that passwords are not remembered')
+            entries = len(cache)
+            cache.run(PasswordEntry(title='Title'))
+            assert len(cache) == entries
+
+            print('Answer cache test: testing that streamed dialogues need an explicit key')
+            try:
+                cache.run(List(('a',), rows=[('1',)], stream_rows=True))
+            except zenity.ZenityError as error:
+                print('error:', error)
+            else:
+                raise AssertionError('a streamed dialogue must not be cached by its arguments only')
+            assert len(cache) == entries
+        assert os.stat(path).st_mode & 0o777 == 0o600
+
+        print('Answer cache test: testing persisted answers')
+        e = SingleLineEntry(text='asked only once', title='Title', entry_text='text')
+        zenity.AnswerCache(path=path).run(e)
+        print('answer:', e.get_result())
+        assert e.zenity_process is None
+
+
+@section_separator
+def test_broker():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'broker.sock')
+        with zenity.DialogueBroker(path) as broker:
+            server = threading.Thread(target=broker.serve_forever)
+            server.start()
+            try:
+                print('Broker test: testing dialogues displayed by a broker')
+                with zenity.BrokerClient(path) as client:
+                    answer = client.request('QuestionMessage', text='this is displayed by the broker', title='Title')
+                    print('answer:', answer)
+                    answer = client.request('Forms', text='this is a form', fields=[['entry', 'Name'],
+                                                                                    ['calendar', 'Date']])
+                    print('answer:', answer)
+                    assert set(answer['result']) == {'Name', 'Date'}
+                    try:
+                        client.request('NoSuchDialogue')
+                    except zenity.ZenityError as error:
+                        print('error:', error)
+            finally:
+                broker.shutdown()
+                server.join()
+        assert not os.path.exists(path)
+
+
+@section_separator
+def test_batch():
+    print('Batch test: testing dialogues described by JSON lines')
+    requests = [{'id': 'question', 'dialogue': 'QuestionMessage', 'options': {'text': 'this is batched'}},
+                {'id': 'entry', 'dialogue': 'SingleLineEntry', 'options': {'text': 'this too', 'entry_text': 'text'}},
+                {'id': 'invalid', 'dialogue': 'NoSuchDialogue'},
+                {'id': 'listen', 'dialogue': 'Notification', 'options': {'text': 'never shown', 'listen': True}}]
+    output = io.StringIO()
+    failures = zenity.run_batch((json.dumps(request) + '\n' for request in requests), output, max_concurrent=2)
+    answers = {answer['id']: answer for answer in map(json.loads, output.getvalue().splitlines())}
+    print('answers:', answers)
+    assert failures == 2 and set(answers) == {'question', 'entry', 'invalid', 'listen'}
+    assert 'error' in answers['invalid'] and 'error' in answers['listen']
+
+
+@section_separator
+def test_observers():
+    collector = zenity.HistogramCollector()
+    events = []
+    zenity.add_observer(collector)
+    zenity.add_observer(events.append)
+    try:
+        print('Observer test: testing lifecycle events')
+        q = QuestionMessage(text='this is text', title='Title')
+        q.run()
+        print('events:', [event.kind for event in events])
+        print('summary:', collector.summary())
+        assert [event.kind for event in events][:2] == ['start', 'spawned']
+        assert events[-1].kind == 'exit' and events[-1].exit_code == q.zenity_process.returncode
+        assert collector.summary()['exits'] == 1
+    finally:
+        zenity.remove_observer(collector)
+        zenity.remove_observer(events.append)
+
+
+@section_separator
+def test_warm_pool():
+    options = {'text': 'this is text',
+               'title': 'Title',
+               'window_icon': '/home/user/Desktop/update.png',
+               'ok_label': 'Ok :-)',
+               'width': 500,
+               'height': 400}
+
+    print('Warm pool test: testing repeated questions')
+    with zenity.WarmDialoguePool(size=1) as pool:
+        for i in range(3):
+            q = QuestionMessage(**options)
+            print('exit code:', pool.run(q))
+            line = SingleLineEntry(entry_text=f'answer {i}', **options)
+            pool.run(line)
+            print('output:', line.get_output())
+
+        print('Warm pool test: testing a deadline')
+        try:
+            pool.run(QuestionMessage(text='this question is closed after 2 seconds', title='Title'), timeout=2)
+        except zenity.ZenityTimeout as error:
+            print('timed out:', error)
+
+    print('Warm pool test: testing that a custom backend disables the helpers')
+    backend = zenity.get_backend()
+    zenity.set_backend(zenity.FAKE_ZENITY)
+    try:
+        with zenity.WarmDialoguePool(size=1) as pool:
+            assert not pool.available
+            q = QuestionMessage(text='this is answered by the backend')
+            assert pool.run(q) == 0 and q.zenity_process is not None
+    finally:
+        zenity.set_backend(backend)
+    with zenity.WarmDialoguePool(size=1, enabled=False) as pool:
+        assert not pool.available
+
+
+@section_separator
+def test_timeouts():
+    print('Timeout test: testing the zenity timeout')
+    q = QuestionMessage(text='this question closes itself after 2 seconds', title='Title', timeout=2)
+    q.run()
+    print('exit code:', q.exit_code)
+
+    print('Timeout test: testing a deadline and the context manager')
+    with QuestionMessage(text='this question is closed after 2 seconds', title='Title') as q:
+        try:
+            q.wait(timeout=2)
+        except zenity.ZenityTimeout as error:
+            print('timed out:', error)
+    print('exit code:', q.zenity_process.returncode)
+
+
+@section_separator
+def test_dialogue_group():
+    print('Group test: testing many dialogues driven from one thread')
+    group = zenity.DialogueGroup(QuestionMessage(text=f'question {i}', title='Title') for i in range(3))
+    group.add(SingleLineEntry(text='answer in any order', entry_text='entry'))
+    for dialogue in group.as_completed(timeout=60):
+        print(type(dialogue).__name__, 'completed with', dialogue.wait(), dialogue.get_output())
+
+    print('Group test: testing that closed groups release their pipes')
+    backend = zenity.get_backend()
+    zenity.set_backend(zenity.FAKE_ZENITY)
+    try:
+        open_fds = len(os.listdir('/proc/self/fd'))
+        for _ in range(20):
+            with zenity.DialogueGroup([QuestionMessage(text='question')]) as group:
+                pass
+        for _ in range(20):
+            zenity.DialogueGroup()
+        assert len(os.listdir('/proc/self/fd')) <= open_fds
+    finally:
+        zenity.set_backend(backend)
+
+
 @section_separator
 def test_question():
     options = {'text': 'this is text',
@@ -302,14 +980,36 @@ def test_question():
 if __name__ == '__main__':
     # test_date()
     # test_list()
+    # test_streamed_list()
+    # test_process_launch()
+    # test_paged_list()
+    # test_typed_results()
+    # test_forms()
     # test_file_selection()
     # test_line_entry()
     # test_progress()
+    # test_progress_track()
+    # test_aggregated_progress()
+    # test_coalescing_progress()
+    # test_input_writer()
+    # test_copy_progress()
+    # test_async_accessors()
+    # test_async_progress()
     # test_text_entry()
+    # test_streamed_text_entry()
     test_warning()
+    # test_dialogue_spec()
+    # test_answer_cache()
     test_error()
+    # test_scheduler()
     test_notification()
+    # test_notification_daemon()
     test_password()
     test_color_selection()
     test_scale()
     test_question()
+    # test_timeouts()
+    # test_warm_pool()
+    # test_broker()
+    # test_batch()
+    # test_dialogue_group()